@@ -1,31 +1,81 @@
+import os
+import click
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
+from .config import config_by_name
 
 db = SQLAlchemy()
 login_manager = LoginManager()
 login_manager.login_view = 'main.login'
 csrf = CSRFProtect()
 
-def create_app():
+def create_app(config_name=None, test_config=None):
     app = Flask(__name__)
-    app.config['SECRET_KEY'] = 'uma-chave-secreta-forte'
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
+    config_name = config_name or os.environ.get('APP_CONFIG', 'production')
+    app.config.from_object(config_by_name[config_name])
+    if test_config:
+        app.config.update(test_config)
 
     db.init_app(app)
     login_manager.init_app(app)
     csrf.init_app(app)
 
-    @app.template_filter('currency')
-    def format_currency(value):
-        return f'R$ {value:,.2f}'.replace(',', 'X').replace('.', ',').replace('X', '.')
+    from .cache import metrics_cache, api_cache, report_cache, user_cache, previsao_cache, fragment_cache
+    metrics_cache.configure(ttl=app.config['METRICS_CACHE_TTL'], maxsize=app.config['METRICS_CACHE_MAXSIZE'])
+    api_cache.configure(ttl=app.config['API_CACHE_TTL'], maxsize=app.config['API_CACHE_MAXSIZE'])
+    user_cache.configure(ttl=app.config['USER_CACHE_TTL'], maxsize=app.config['USER_CACHE_MAXSIZE'])
+    report_cache.configure(ttl=app.config['REPORT_CACHE_TTL'], maxsize=app.config['REPORT_CACHE_MAXSIZE'])
+    previsao_cache.configure(maxsize=app.config['PREVISAO_CACHE_MAXSIZE'])
+    fragment_cache.configure(ttl=app.config['FRAGMENT_CACHE_TTL'], maxsize=app.config['FRAGMENT_CACHE_MAXSIZE'])
 
+    from . import auth
+    auth.limite_ip.configure(app.config['LOGIN_LIMIT_IP_CAPACITY'], app.config['LOGIN_LIMIT_IP_PER_MINUTE'])
+    auth.limite_usuario.configure(app.config['LOGIN_LIMIT_USER_CAPACITY'], app.config['LOGIN_LIMIT_USER_PER_MINUTE'])
+
+    from .money import formatar
+    app.add_template_filter(formatar, 'currency')
+
+    from . import assets, fragmentos
+    fragmentos.init_app(app)
+    assets.init_app(app)
+
+    # Nada aqui abre conexão com o banco: o esquema vem das migrações
+    # (`flask db upgrade`, uma vez por deploy) e cada worker só monta o app.
     with app.app_context():
+        from .database import configure_engine, init_migrate
+        configure_engine(app)
+
+        if app.config['INSTRUMENTATION_ENABLED']:
+            from . import instrumentation
+            instrumentation.init_app(app)
+
         from . import routes
         app.register_blueprint(routes.main)
-        
-        from . import models
-        db.create_all()
 
-    return app
\ No newline at end of file
+        from . import api
+        app.register_blueprint(api.api, url_prefix='/api/v1')
+
+        # Comandos `flask db ...`: o alembic só é importado quando o app é
+        # carregado pelo CLI, não nos workers web
+        if click.get_current_context(silent=True) is not None:
+            init_migrate(app)
+
+        from . import rollups
+        app.cli.add_command(rollups.rebuild_command)
+
+        from . import search
+        app.cli.add_command(search.rebuild_command)
+
+        from . import importer
+        app.cli.add_command(importer.importar_command)
+
+        from . import jobs
+        app.cli.add_command(jobs.worker_command)
+
+        from . import estoque
+        app.cli.add_command(estoque.checkpoint_command)
+        app.cli.add_command(estoque.verificar_command)
+
+    return app
@@ -0,0 +1,308 @@
+import hashlib
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import wraps
+from flask import Blueprint, Response, abort, jsonify, request
+from flask_login import current_user
+from werkzeug.exceptions import HTTPException
+from . import estoque, previsao, reports, versions
+from .cache import api_cache
+from .models import Client, Product, Sale, Supplier
+from .pagination import keyset_page
+
+# ---------- API JSON SOMENTE LEITURA (v1) ----------
+# Respostas levam um ETag derivado das versões das tabelas envolvidas
+# (versions.py): se nada mudou, o cliente recebe 304 sem nenhuma consulta aos
+# dados, e outros clientes recebem o corpo já serializado do api_cache.
+
+api = Blueprint('api', __name__)
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+RECURSOS = {
+    'clientes': {
+        'model': Client,
+        'tabelas': ('client',),
+        'campos': {'id': Client.id, 'nome': Client.nome, 'email': Client.email, 'telefone': Client.telefone,
+                   'notas': Client.notas, 'created_at': Client.created_at},
+    },
+    'produtos': {
+        'model': Product,
+        'tabelas': ('product',),
+        'campos': {'id': Product.id, 'nome': Product.nome, 'preco': Product.preco, 'descricao': Product.descricao,
+                   'estoque': Product.estoque, 'estoque_minimo': Product.estoque_minimo,
+                   'fornecedor_id': Product.fornecedor_id,
+                   'created_at': Product.created_at},
+    },
+    'fornecedores': {
+        'model': Supplier,
+        'tabelas': ('supplier',),
+        'campos': {'id': Supplier.id, 'nome': Supplier.nome, 'email': Supplier.email,
+                   'telefone': Supplier.telefone, 'endereco': Supplier.endereco, 'created_at': Supplier.created_at},
+    },
+}
+
+CAMPOS_VENDA = {
+    'id': Sale.id, 'created_at': Sale.created_at, 'cliente_id': Sale.cliente_id, 'produto_id': Sale.produto_id,
+    'quantidade': Sale.quantidade, 'total': Sale.total, 'pedido_id': Sale.pedido_id,
+    'cliente': Client.nome.label('cliente'), 'produto': Product.nome.label('produto'),
+}
+
+TABELAS_RELATORIOS = ('sale_daily', 'sale_daily_product', 'sale_daily_client', 'product', 'client')
+
+# ---------- AUXILIARES ----------
+def api_login_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_user.is_authenticated:
+            abort(401)
+        return view(*args, **kwargs)
+    return wrapper
+
+def versionado(*tabelas, extra=None):
+    """Responde 304 se o ETag do cliente bater; senão usa/guarda o corpo no api_cache.
+
+    extra: função opcional cujo retorno também entra na chave e no ETag, para
+    respostas que mudam sem escrita nas tabelas (ex.: com a data).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versoes = versions.atuais(*tabelas)
+            chave = (request.full_path, versoes)
+            if extra is not None:
+                chave += (extra(),)
+            etag = hashlib.sha1(repr(chave).encode()).hexdigest()
+            if etag in request.if_none_match:
+                resposta = Response(status=304)
+            else:
+                corpo = api_cache.get(chave)
+                if corpo is None:
+                    corpo = json.dumps(view(*args, **kwargs), ensure_ascii=False, default=_json_default)
+                    api_cache.set(chave, corpo)
+                resposta = Response(corpo, mimetype='application/json')
+            resposta.set_etag(etag)
+            resposta.headers['Cache-Control'] = 'private, no-cache'
+            return resposta
+        return wrapper
+    return decorator
+
+def _json_default(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    raise TypeError(f'{type(valor).__name__} não serializável')
+
+def _campos(disponiveis):
+    pedido = request.args.get('fields')
+    if not pedido:
+        return list(disponiveis)
+    campos = [c.strip() for c in pedido.split(',') if c.strip()]
+    invalidos = [c for c in campos if c not in disponiveis]
+    if invalidos:
+        abort(400, description=f"Campos inválidos: {', '.join(invalidos)}")
+    return campos
+
+def _limite():
+    limite = request.args.get('limit', DEFAULT_LIMIT, type=int)
+    return max(1, min(limite, MAX_LIMIT))
+
+def _periodo():
+    try:
+        inicio = request.args.get('start_date')
+        fim = request.args.get('end_date')
+        return (datetime.strptime(inicio, '%Y-%m-%d').date() if inicio else None,
+                datetime.strptime(fim, '%Y-%m-%d').date() if fim else None)
+    except ValueError:
+        abort(400, description='Datas devem estar no formato AAAA-MM-DD')
+
+def _listar(nome):
+    """Lista paginada por id crescente: next_cursor é o último id da página."""
+    recurso = RECURSOS[nome]
+    model = recurso['model']
+    campos = _campos(recurso['campos'])
+    colunas = [recurso['campos'][c] for c in campos]
+    if 'id' not in campos:
+        colunas.append(model.id)
+
+    query = model.query.with_entities(*colunas)
+    cursor = request.args.get('cursor')
+    if cursor:
+        if not cursor.isdigit():
+            abort(400, description='Cursor inválido')
+        query = query.filter(model.id > int(cursor))
+    limite = _limite()
+    rows = query.order_by(model.id).limit(limite + 1).all()
+
+    itens = rows[:limite]
+    return {
+        'data': [{c: getattr(row, c) for c in campos} for row in itens],
+        'next_cursor': str(itens[-1].id) if len(rows) > limite else None,
+    }
+
+def _detalhe(nome, item_id):
+    recurso = RECURSOS[nome]
+    model = recurso['model']
+    campos = _campos(recurso['campos'])
+    row = model.query.with_entities(*[recurso['campos'][c] for c in campos]).filter(model.id == item_id).first()
+    if row is None:
+        abort(404)
+    return {'data': {c: getattr(row, c) for c in campos}}
+
+@api.errorhandler(HTTPException)
+def erro_http(e):
+    return jsonify({'error': e.name, 'description': e.description}), e.code
+
+# ---------- CLIENTES, PRODUTOS E FORNECEDORES ----------
+@api.route('/clientes')
+@api_login_required
+@versionado('client')
+def clientes():
+    return _listar('clientes')
+
+@api.route('/clientes/<int:item_id>')
+@api_login_required
+@versionado('client')
+def cliente(item_id):
+    return _detalhe('clientes', item_id)
+
+@api.route('/produtos')
+@api_login_required
+@versionado('product')
+def produtos():
+    return _listar('produtos')
+
+@api.route('/produtos/<int:item_id>')
+@api_login_required
+@versionado('product')
+def produto(item_id):
+    return _detalhe('produtos', item_id)
+
+@api.route('/fornecedores')
+@api_login_required
+@versionado('supplier')
+def fornecedores():
+    return _listar('fornecedores')
+
+@api.route('/fornecedores/<int:item_id>')
+@api_login_required
+@versionado('supplier')
+def fornecedor(item_id):
+    return _detalhe('fornecedores', item_id)
+
+@api.route('/produtos/<int:item_id>/estoque')
+@api_login_required
+@versionado('product', 'stock_movement', 'stock_checkpoint')
+def estoque_do_produto(item_id):
+    """Estoque atual e, com ?data=AAAA-MM-DD, o saldo ao fim daquele dia pelo registro de movimentações."""
+    row = Product.query.with_entities(Product.estoque).filter(Product.id == item_id).first()
+    if row is None:
+        abort(404)
+    dados = {'produto_id': item_id, 'estoque': row.estoque}
+    data = request.args.get('data')
+    if data:
+        try:
+            dia = datetime.strptime(data, '%Y-%m-%d').date()
+        except ValueError:
+            abort(400, description='Datas devem estar no formato AAAA-MM-DD')
+        dados['data'] = dia
+        dados['saldo'] = estoque.saldo_em(item_id, datetime.combine(dia, datetime.max.time()))
+    return {'data': dados}
+
+# ---------- VENDAS ----------
+@api.route('/vendas')
+@api_login_required
+@versionado('sale', 'client', 'product')
+def vendas():
+    """Mais recentes primeiro, com o mesmo cursor (created_at, id) de /vendas."""
+    campos = _campos(CAMPOS_VENDA)
+    colunas = [CAMPOS_VENDA[c] for c in campos]
+    for obrigatoria in ('id', 'created_at'):
+        if obrigatoria not in campos:
+            colunas.append(CAMPOS_VENDA[obrigatoria])
+
+    query = Sale.query.with_entities(*colunas)
+    if 'cliente' in campos:
+        query = query.outerjoin(Client, Client.id == Sale.cliente_id)
+    if 'produto' in campos:
+        query = query.outerjoin(Product, Product.id == Sale.produto_id)
+
+    inicio, fim = _periodo()
+    if inicio:
+        query = query.filter(Sale.created_at >= datetime.combine(inicio, datetime.min.time()))
+    if fim:
+        query = query.filter(Sale.created_at < datetime.combine(fim + timedelta(days=1), datetime.min.time()))
+    cliente_id = request.args.get('cliente_id', type=int)
+    produto_id = request.args.get('produto_id', type=int)
+    if cliente_id:
+        query = query.filter(Sale.cliente_id == cliente_id)
+    if produto_id:
+        query = query.filter(Sale.produto_id == produto_id)
+
+    itens, next_cursor = keyset_page(query, Sale.created_at, Sale.id,
+                                     cursor=request.args.get('cursor'), per_page=_limite())
+    return {
+        'data': [{c: getattr(row, c) for c in campos} for row in itens],
+        'next_cursor': next_cursor,
+    }
+
+# ---------- RELATÓRIOS ----------
+@api.route('/relatorios/vendas-mensais')
+@api_login_required
+@versionado(*TABELAS_RELATORIOS)
+def vendas_mensais():
+    inicio, fim = _periodo()
+    return {'data': [{'mes': r.mes, 'total': r.total_mes} for r in reports.vendas_mensais(inicio, fim)]}
+
+@api.route('/relatorios/produtos-mais-vendidos')
+@api_login_required
+@versionado(*TABELAS_RELATORIOS)
+def produtos_mais_vendidos():
+    inicio, fim = _periodo()
+    linhas = reports.produtos_mais_vendidos(inicio, fim, limit=_limite())
+    return {'data': [{'produto': r.nome, 'quantidade': r.total_quantidade} for r in linhas]}
+
+@api.route('/relatorios/clientes-top')
+@api_login_required
+@versionado(*TABELAS_RELATORIOS)
+def clientes_top():
+    inicio, fim = _periodo()
+    linhas = reports.clientes_top(inicio, fim, limit=_limite())
+    return {'data': [{'cliente': r.nome, 'total': r.total_gasto} for r in linhas]}
+
+# ---------- ESTOQUE ----------
+@api.route('/estoque-baixo')
+@api_login_required
+@versionado('product', 'supplier')
+def estoque_baixo():
+    """Produtos a repor agrupados por fornecedor (filtro opcional fornecedor_id)."""
+    linhas = estoque.produtos_a_repor(request.args.get('fornecedor_id', type=int))
+    return {'data': [
+        {
+            'fornecedor_id': fornecedor_id,
+            'fornecedor': nome,
+            'produtos': [{'id': p.id, 'nome': p.nome, 'estoque': p.estoque, 'estoque_minimo': p.estoque_minimo,
+                          'faltam': p.faltam} for p in produtos],
+        }
+        for fornecedor_id, nome, produtos in estoque.por_fornecedor(linhas)
+    ]}
+
+@api.route('/previsao')
+@api_login_required
+@versionado('sale_daily_product', 'product', 'supplier', extra=previsao.dia_base)
+def previsao_reposicao():
+    """Sugestões de reposição pela previsão de demanda, por fornecedor (filtro opcional fornecedor_id)."""
+    linhas = previsao.sugestoes(request.args.get('fornecedor_id', type=int))
+    return {'data': [
+        {
+            'fornecedor_id': fornecedor_id,
+            'fornecedor': nome,
+            'produtos': [{'id': s.id, 'nome': s.nome, 'estoque': s.estoque, 'estoque_minimo': s.estoque_minimo,
+                          'media_movel': s.media_movel, 'demanda_diaria': s.demanda,
+                          'dias_restantes': s.dias_restantes, 'sugerido': s.sugerido} for s in produtos],
+        }
+        for fornecedor_id, nome, produtos in estoque.por_fornecedor(linhas)
+    ]}
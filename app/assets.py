@@ -0,0 +1,103 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import click
+from flask import Blueprint, current_app, request, send_from_directory, url_for
+from flask.cli import with_appcontext
+
+# ---------- ARQUIVOS ESTÁTICOS COM IMPRESSÃO DIGITAL ----------
+# `flask build-assets` (uma vez por deploy, como o `flask db upgrade`) copia
+# cada arquivo de ARQUIVOS para static/dist com o hash do conteúdo no nome
+# (css/style.3f2a9c1b04de.css) e grava ao lado as versões .gz e .br já
+# comprimidas. O manifesto liga o nome original ao atual.
+#
+# Como o nome muda junto com o conteúdo, /assets/ responde com cache
+# "immutable" de um ano e escolhe a versão comprimida pelo Accept-Encoding,
+# sem comprimir nada por requisição. Sem o manifesto (ambiente de
+# desenvolvimento), asset_url aponta para o arquivo original em /static.
+
+ARQUIVOS = ('css/style.css', 'js/app.js')
+DESTINO = 'dist'
+MANIFESTO = 'manifest.json'
+UM_ANO = 365 * 24 * 3600
+CODIFICACOES = (('br', '.br'), ('gzip', '.gz'))
+
+assets = Blueprint('assets', __name__)
+
+def _destino(app):
+    return os.path.join(app.static_folder, DESTINO)
+
+def construir(app):
+    """Gera os arquivos com hash, as versões comprimidas e o manifesto; retorna o manifesto."""
+    import brotli
+
+    destino = _destino(app)
+    manifesto = {}
+    for nome in ARQUIVOS:
+        with open(os.path.join(app.static_folder, nome), 'rb') as arquivo:
+            conteudo = arquivo.read()
+        base, extensao = os.path.splitext(nome)
+        final = f'{base}.{hashlib.sha256(conteudo).hexdigest()[:12]}{extensao}'
+        caminho = os.path.join(destino, final)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        with open(caminho, 'wb') as arquivo:
+            arquivo.write(conteudo)
+        with open(caminho + '.gz', 'wb') as arquivo:
+            arquivo.write(gzip.compress(conteudo, compresslevel=9, mtime=0))
+        with open(caminho + '.br', 'wb') as arquivo:
+            arquivo.write(brotli.compress(conteudo, quality=11))
+        manifesto[nome] = final
+    with open(os.path.join(destino, MANIFESTO), 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, indent=2, sort_keys=True)
+    app.extensions['assets'] = manifesto
+    return manifesto
+
+def _manifesto():
+    # Lido uma vez por processo, no primeiro uso (nada é lido no create_app)
+    manifesto = current_app.extensions.get('assets')
+    if manifesto is None:
+        try:
+            with open(os.path.join(_destino(current_app), MANIFESTO), encoding='utf-8') as arquivo:
+                manifesto = json.load(arquivo)
+        except FileNotFoundError:
+            manifesto = {}
+        current_app.extensions['assets'] = manifesto
+    return manifesto
+
+def asset_url(nome):
+    final = _manifesto().get(nome)
+    if final is None:
+        return url_for('static', filename=nome)
+    return url_for('assets.arquivo', nome=final)
+
+@assets.route('/assets/<path:nome>')
+def arquivo(nome):
+    destino = _destino(current_app)
+    mimetype = mimetypes.guess_type(nome)[0] or 'application/octet-stream'
+    enviado, codificacao, melhor = nome, None, 0
+    # Maior q aceito pelo cliente entre as versões que existem; q=0 recusa. No empate, br
+    for candidata, sufixo in CODIFICACOES:
+        qualidade = request.accept_encodings[candidata]
+        if qualidade > melhor and os.path.isfile(os.path.join(destino, nome + sufixo)):
+            enviado, codificacao, melhor = nome + sufixo, candidata, qualidade
+    resposta = send_from_directory(destino, enviado, mimetype=mimetype, max_age=UM_ANO)
+    if codificacao:
+        resposta.content_encoding = codificacao
+    resposta.vary.add('Accept-Encoding')
+    resposta.cache_control.public = True
+    resposta.cache_control.immutable = True
+    return resposta
+
+@click.command('build-assets')
+@with_appcontext
+def build_command():
+    """Gera os arquivos estáticos com hash no nome e comprimidos (gzip e brotli)."""
+    for nome, final in construir(current_app).items():
+        click.echo(f'{nome} -> {DESTINO}/{final}')
+
+def init_app(app):
+    app.register_blueprint(assets)
+    app.add_template_global(asset_url)
+    app.cli.add_command(build_command)
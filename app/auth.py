@@ -0,0 +1,103 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from flask_login import UserMixin
+from werkzeug.security import generate_password_hash
+from . import db, login_manager
+from .cache import user_cache
+from .models import User
+
+# ---------- USUÁRIO DA SESSÃO (CACHE) ----------
+# load_user roda em toda requisição autenticada. Guardamos por USER_CACHE_TTL
+# segundos uma cópia leve do usuário (não a instância do ORM, que fica presa
+# à sessão do banco). A invalidação explícita vale para o processo que fez a
+# escrita; nos demais, o TTL curto limita o atraso.
+
+class UsuarioSessao(UserMixin):
+    def __init__(self, id, username, email):
+        self.id = id
+        self.username = username
+        self.email = email
+
+@login_manager.user_loader
+def load_user(user_id):
+    user_id = int(user_id)
+    usuario = user_cache.get(user_id)
+    if usuario is None:
+        row = db.session.query(User.id, User.username, User.email).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        usuario = UsuarioSessao(row.id, row.username, row.email)
+        user_cache.set(user_id, usuario)
+    return usuario
+
+def invalidar_usuario(user_id):
+    user_cache.invalidate(user_id)
+
+# ---------- HASH DE SENHA ----------
+_prefixos = {}
+
+def metodo_hash():
+    return current_app.config['PASSWORD_HASH_METHOD']
+
+def precisa_rehash(password_hash):
+    """True se o hash foi gerado com outro método/custo que o configurado."""
+    metodo = metodo_hash()
+    if metodo not in _prefixos:
+        # Normaliza o método (ex.: 'pbkdf2' -> 'pbkdf2:sha256:1000000') gerando um hash uma vez
+        _prefixos[metodo] = generate_password_hash('', method=metodo).split('$', 1)[0]
+    return password_hash.split('$', 1)[0] != _prefixos[metodo]
+
+# ---------- LIMITE DE TENTATIVAS DE LOGIN ----------
+class TokenBucket:
+    """Baldes de fichas por chave (IP ou usuário), em memória e por processo.
+
+    Cada chave começa com `capacidade` fichas e recupera `por_minuto` fichas
+    por minuto. O número de chaves é limitado (LRU) para que chaves
+    inventadas não esgotem a memória.
+    """
+
+    def __init__(self, capacidade=10, por_minuto=10, max_chaves=10000):
+        self.capacidade = capacidade
+        self.por_minuto = por_minuto
+        self.max_chaves = max_chaves
+        self._baldes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, capacidade=None, por_minuto=None):
+        with self._lock:
+            if capacidade is not None:
+                self.capacidade = capacidade
+            if por_minuto is not None:
+                self.por_minuto = por_minuto
+            self._baldes.clear()
+
+    def consumir(self, chave):
+        """Tenta gastar uma ficha; retorna 0 se conseguiu ou os segundos até a próxima."""
+        agora = time.monotonic()
+        taxa = self.por_minuto / 60
+        with self._lock:
+            fichas, ultimo = self._baldes.pop(chave, (self.capacidade, agora))
+            fichas = min(self.capacidade, fichas + (agora - ultimo) * taxa)
+            espera = 0
+            if fichas >= 1:
+                fichas -= 1
+            else:
+                espera = math.ceil((1 - fichas) / taxa) if taxa else 60
+            self._baldes[chave] = (fichas, agora)
+            while len(self._baldes) > self.max_chaves:
+                self._baldes.popitem(last=False)
+            return espera
+
+    def clear(self):
+        with self._lock:
+            self._baldes.clear()
+
+limite_ip = TokenBucket(capacidade=20, por_minuto=10)
+limite_usuario = TokenBucket(capacidade=5, por_minuto=5)
+
+def tentativa_de_login(ip, username):
+    """Gasta uma ficha do IP e uma do usuário; retorna os segundos de espera (0 = liberado)."""
+    return max(limite_ip.consumir(ip), limite_usuario.consumir((username or '').strip().casefold()))
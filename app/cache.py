@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+
+# ---------- CACHE EM MEMÓRIA (TTL + LRU) ----------
+class TTLCache:
+    """Cache por processo com expiração (TTL) e limite de entradas (LRU).
+
+    Cada worker do gunicorn tem o seu; a invalidação explícita vale para o
+    processo que fez a escrita e o TTL limita o tempo que os demais ficam
+    desatualizados.
+    """
+
+    def __init__(self, ttl=30, maxsize=128):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, ttl=None, maxsize=None):
+        with self._lock:
+            if ttl is not None:
+                self.ttl = ttl
+            if maxsize is not None:
+                self.maxsize = maxsize
+            self._data.clear()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, factory):
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+            }
+
+# Métricas do dashboard
+metrics_cache = TTLCache()
+
+# Corpos JSON da API; a chave inclui as versões das tabelas, então não há
+# invalidação explícita e o TTL só limita o tempo de vida das entradas
+api_cache = TTLCache(ttl=300, maxsize=512)
+
+# Usuário da sessão (auth.load_user), por id
+user_cache = TTLCache(ttl=30, maxsize=1024)
+
+# Agregados de meses encerrados (reports.py); também versionados na chave
+report_cache = TTLCache(ttl=86400, maxsize=1024)
+
+# Sugestões de reposição (previsao.py); versionadas na chave como a API
+previsao_cache = TTLCache(ttl=86400, maxsize=32)
+
+# Fragmentos HTML das listagens (fragmentos.py); versionados na chave
+fragment_cache = TTLCache(ttl=600, maxsize=64)
+
+# Chaves afetadas por escritas em cada tabela
+CLIENTES_KEYS = ('clientes_count', 'ultimos_clientes', 'ultimas_vendas')
+PRODUTOS_KEYS = ('produtos_count', 'ultimos_produtos', 'ultimas_vendas', 'estoque_baixo')
+FORNECEDORES_KEYS = ('fornecedores_count', 'estoque_baixo')
+VENDAS_KEYS = ('vendas_total', 'ultimas_vendas', 'estoque_baixo')
+USERS_KEYS = ('users_count',)
@@ -0,0 +1,95 @@
+import os
+
+# ---------- CONFIGURAÇÃO ----------
+# Valores padrão sobrescritos por variáveis de ambiente. A classe usada é
+# escolhida por APP_CONFIG (development, production ou testing).
+
+def _env_int(nome, padrao):
+    return int(os.environ.get(nome, padrao))
+
+def _env_bool(nome, padrao=False):
+    return os.environ.get(nome, str(padrao)).lower() in ('1', 'true', 'yes', 'on')
+
+class Config:
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'uma-chave-secreta-forte')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///database.db')
+
+    # Pool de conexões (por processo)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': _env_int('DB_POOL_SIZE', 5),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+    }
+
+    # PRAGMAs aplicados a cada nova conexão SQLite (ver database.py).
+    # WAL permite leituras simultâneas a uma escrita; busy_timeout faz a
+    # conexão esperar pelo lock em vez de falhar com "database is locked".
+    SQLITE_PRAGMAS = {
+        'busy_timeout': _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000),
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'cache_size': -_env_int('SQLITE_CACHE_SIZE_KB', 64000),
+        'mmap_size': _env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+        'temp_store': 'MEMORY',
+    }
+
+    METRICS_CACHE_TTL = _env_int('METRICS_CACHE_TTL', 30)
+    METRICS_CACHE_MAXSIZE = _env_int('METRICS_CACHE_MAXSIZE', 128)
+    API_CACHE_TTL = _env_int('API_CACHE_TTL', 300)
+    API_CACHE_MAXSIZE = _env_int('API_CACHE_MAXSIZE', 512)
+    USER_CACHE_TTL = _env_int('USER_CACHE_TTL', 30)
+    USER_CACHE_MAXSIZE = _env_int('USER_CACHE_MAXSIZE', 1024)
+    REPORT_CACHE_TTL = _env_int('REPORT_CACHE_TTL', 86400)
+    REPORT_CACHE_MAXSIZE = _env_int('REPORT_CACHE_MAXSIZE', 1024)
+    FRAGMENT_CACHE_TTL = _env_int('FRAGMENT_CACHE_TTL', 600)
+    FRAGMENT_CACHE_MAXSIZE = _env_int('FRAGMENT_CACHE_MAXSIZE', 64)
+
+    # Senhas: método/custo do werkzeug (ex.: 'pbkdf2:sha256:600000'); hashes
+    # com outro método são refeitos no próximo login. Limites de tentativas de
+    # login por IP e por usuário: fichas iniciais e fichas recuperadas por minuto.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    LOGIN_LIMIT_IP_CAPACITY = _env_int('LOGIN_LIMIT_IP_CAPACITY', 20)
+    LOGIN_LIMIT_IP_PER_MINUTE = _env_int('LOGIN_LIMIT_IP_PER_MINUTE', 10)
+    LOGIN_LIMIT_USER_CAPACITY = _env_int('LOGIN_LIMIT_USER_CAPACITY', 5)
+    LOGIN_LIMIT_USER_PER_MINUTE = _env_int('LOGIN_LIMIT_USER_PER_MINUTE', 5)
+
+    # Instrumentação opcional (ver instrumentation.py)
+    INSTRUMENTATION_ENABLED = _env_bool('INSTRUMENTATION_ENABLED')
+    SLOW_QUERY_MS = _env_int('SLOW_QUERY_MS', 100)
+    QUERY_COUNT_WARNING = _env_int('QUERY_COUNT_WARNING', 20)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # Tarefas em segundo plano (ver jobs.py); JOBS_DIR vazio = instance/jobs
+    JOBS_DIR = os.environ.get('JOBS_DIR')
+    JOBS_PROCESSES = _env_int('JOBS_PROCESSES', 2)
+    JOBS_POLL_SECONDS = float(os.environ.get('JOBS_POLL_SECONDS', 1.0))
+    JOBS_RETENTION_DAYS = _env_int('JOBS_RETENTION_DAYS', 7)
+
+    # Previsão de demanda (ver previsao.py): suavização exponencial, janela da
+    # média móvel e histórico lido, prazo de entrega e cobertura do pedido (dias)
+    PREVISAO_ALPHA = float(os.environ.get('PREVISAO_ALPHA', 0.1))
+    PREVISAO_JANELA_DIAS = _env_int('PREVISAO_JANELA_DIAS', 28)
+    PREVISAO_HISTORICO_DIAS = _env_int('PREVISAO_HISTORICO_DIAS', 3 * 365)
+    PREVISAO_PRAZO_DIAS = _env_int('PREVISAO_PRAZO_DIAS', 7)
+    PREVISAO_COBERTURA_DIAS = _env_int('PREVISAO_COBERTURA_DIAS', 30)
+    PREVISAO_CACHE_MAXSIZE = _env_int('PREVISAO_CACHE_MAXSIZE', 32)
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+
+class ProductionConfig(Config):
+    pass
+
+class TestingConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    # Banco em memória usa StaticPool, que não aceita opções de pool
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+
+config_by_name = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+}
@@ -0,0 +1,54 @@
+import os
+from sqlalchemy import event
+from . import db
+from .money import Dinheiro
+
+# ---------- AJUSTES DO ENGINE SQLITE ----------
+def configure_engine(app):
+    """Registra os PRAGMAs de SQLITE_PRAGMAS para cada nova conexão do pool.
+
+    Deve ser chamado dentro do app context e antes do primeiro uso do banco.
+    """
+    engine = db.engine
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _aplicar_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for nome, valor in pragmas.items():
+            cursor.execute(f'PRAGMA {nome}={valor}')
+        cursor.close()
+
+# ---------- MIGRAÇÕES (Flask-Migrate / Alembic) ----------
+# O esquema é criado e alterado pelas migrações em migrations/, aplicadas uma
+# vez por deploy com `flask db upgrade`; create_app não toca no banco.
+# Gatilhos, contadores de table_version e tabelas FTS5 são criados pelas
+# próprias migrações, com o DDL copiado na revisão (mudanças vão em revisões
+# novas), e ficam fora da comparação do alembic.
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+def _incluir_no_alembic(objeto, nome, tipo, refletido, comparado):
+    # Tabelas FTS5 e suas tabelas internas (client_fts, client_fts_data...) não têm modelo
+    return not (tipo == 'table' and refletido and comparado is None and '_fts' in nome)
+
+def _render_item(tipo, objeto, autogen_context):
+    # Colunas Dinheiro são INTEGER (centavos) no banco; a migração não depende do app
+    if tipo == 'type' and isinstance(objeto, Dinheiro):
+        return 'sa.Integer()'
+    return False
+
+def init_migrate(app):
+    """Registra o Flask-Migrate (comandos `flask db ...`); importa o alembic só quando chamado."""
+    from flask_migrate import Migrate
+    Migrate(app, db, directory=MIGRATIONS_DIR, include_object=_incluir_no_alembic, render_item=_render_item)
+
+def criar_esquema(app):
+    """Aplica todas as migrações ao banco do app (bancos novos de testes e benchmarks)."""
+    from flask_migrate import upgrade
+    if 'migrate' not in app.extensions:
+        init_migrate(app)
+    with app.app_context():
+        upgrade()
@@ -0,0 +1,206 @@
+from datetime import datetime
+from itertools import groupby
+import click
+from flask import has_request_context
+from flask.cli import with_appcontext
+from flask_login import current_user
+from sqlalchemy import bindparam, insert, select, text, update
+from sqlalchemy.sql import func
+from . import db
+from .models import Product, StockCheckpoint, StockMovement, Supplier
+
+# ---------- ALERTAS DE REPOSIÇÃO ----------
+# Todas as consultas filtram por estoque <= estoque_minimo, o mesmo predicado
+# do índice parcial ix_product_estoque_baixo: o SQLite lê só as entradas do
+# índice (produtos a repor), já na ordem fornecedor/estoque.
+
+SEM_FORNECEDOR = 'Sem fornecedor'
+
+def _abaixo_do_minimo():
+    return Product.estoque <= Product.estoque_minimo
+
+def produtos_a_repor(fornecedor_id=None, limit=None):
+    """Produtos no ponto de reposição ou abaixo, por fornecedor e do menor estoque para o maior."""
+    query = db.session.query(
+        Product.id,
+        Product.nome,
+        Product.estoque,
+        Product.estoque_minimo,
+        (Product.estoque_minimo - Product.estoque).label('faltam'),
+        Product.fornecedor_id,
+        Supplier.nome.label('fornecedor'),
+    ).outerjoin(Supplier, Supplier.id == Product.fornecedor_id).filter(_abaixo_do_minimo())
+    if fornecedor_id is not None:
+        query = query.filter(Product.fornecedor_id == fornecedor_id)
+    query = query.order_by(Product.fornecedor_id, Product.estoque, Product.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+def contar():
+    return db.session.query(func.count()).select_from(Product).filter(_abaixo_do_minimo()).scalar()
+
+def por_fornecedor(linhas):
+    """Agrupa linhas de produtos_a_repor em [(fornecedor_id, nome, [produtos])]."""
+    grupos = []
+    for fornecedor_id, grupo in groupby(linhas, key=lambda linha: linha.fornecedor_id):
+        itens = list(grupo)
+        grupos.append((fornecedor_id, itens[0].fornecedor or SEM_FORNECEDOR, itens))
+    return grupos
+
+def resumo(limit=10):
+    """Dados do widget do dashboard: total de produtos a repor e os mais críticos."""
+    criticos = db.session.query(Product.nome, Product.estoque, Product.estoque_minimo).filter(
+        _abaixo_do_minimo()
+    ).order_by(Product.estoque - Product.estoque_minimo, Product.id).limit(limit).all()
+    return {'total': contar(), 'criticos': criticos}
+
+# ---------- MOVIMENTAÇÕES ----------
+# Toda escrita em Product.estoque passa por aqui (ou por sales.py) e grava o
+# movimento correspondente na mesma transação; nenhuma função faz commit.
+
+VENDA = 'venda'
+ESTORNO = 'estorno'
+AJUSTE = 'ajuste'
+IMPORTACAO = 'importacao'
+
+class EstoqueAlterado(Exception):
+    pass
+
+def _usuario_atual():
+    if has_request_context() and current_user.is_authenticated:
+        return current_user.id
+    return None
+
+def movimento(produto_id, tipo, quantidade, venda_id=None, observacao=None, created_at=None):
+    """Monta a linha de StockMovement (todas as chaves, para o executemany)."""
+    return {
+        'produto_id': produto_id,
+        'tipo': tipo,
+        'quantidade': quantidade,
+        'venda_id': venda_id,
+        'usuario_id': _usuario_atual(),
+        'observacao': observacao,
+        'created_at': created_at or datetime.utcnow(),
+    }
+
+def registrar(movimentos):
+    """Grava os movimentos em um único executemany."""
+    if movimentos:
+        db.session.execute(insert(StockMovement), movimentos)
+
+# Os produtos de um lote recém-inserido na transação: com o lock de escrita
+# já obtido pelo INSERT, o SQLite numera as linhas em sequência a partir do
+# maior id, então o lote são os `n` maiores ids.
+_IMPORTACAO = text("""
+    INSERT INTO stock_movement (produto_id, tipo, quantidade, usuario_id, created_at)
+    SELECT id, :tipo, estoque, :usuario_id, :created_at FROM product
+    WHERE id > (SELECT MAX(id) FROM product) - :n AND COALESCE(estoque, 0) != 0
+""").bindparams(bindparam('created_at', type_=StockMovement.created_at.type))
+
+def registrar_importacao(n):
+    """Registra a entrada do estoque inicial dos `n` produtos recém-inseridos, em um único comando."""
+    db.session.execute(_IMPORTACAO, {'tipo': IMPORTACAO, 'usuario_id': _usuario_atual(),
+                                     'created_at': datetime.utcnow(), 'n': n})
+
+def definir(produto_id, novo, tipo=AJUSTE, observacao=None, tentativas=5):
+    """Define o estoque de um produto e registra a diferença.
+
+    O UPDATE só vale se o estoque ainda for o lido, então uma venda
+    concorrente não some do registro: relê e tenta de novo.
+    """
+    for _ in range(tentativas):
+        anterior = db.session.execute(select(Product.estoque).where(Product.id == produto_id)).scalar()
+        stmt = update(Product).where(Product.id == produto_id, Product.estoque == anterior).values(estoque=novo)
+        if db.session.execute(stmt, execution_options={'synchronize_session': False}).rowcount:
+            if novo != (anterior or 0):
+                registrar([movimento(produto_id, tipo, novo - (anterior or 0), observacao=observacao)])
+            return
+    raise EstoqueAlterado()
+
+# ---------- CHECKPOINTS E ESTOQUE EM UMA DATA ----------
+# Um único INSERT ... SELECT: para cada produto com pelo menos `minimo`
+# movimentos depois do último checkpoint, grava o novo saldo acumulado.
+_CHECKPOINT = text("""
+    INSERT INTO stock_checkpoint (produto_id, movimento_id, saldo, created_at)
+    SELECT m.produto_id, MAX(m.id), COALESCE(cp.saldo, 0) + SUM(m.quantidade), MAX(m.created_at)
+    FROM stock_movement m
+    LEFT JOIN stock_checkpoint cp ON cp.id = (
+        SELECT id FROM stock_checkpoint WHERE produto_id = m.produto_id ORDER BY movimento_id DESC LIMIT 1
+    )
+    WHERE m.id > COALESCE(cp.movimento_id, 0)
+    GROUP BY m.produto_id
+    HAVING COUNT(*) >= :minimo
+""")
+
+# Saldo do registro (último checkpoint + movimentos seguintes) x estoque atual
+_DIVERGENCIAS = text("""
+    SELECT id, nome, estoque, saldo FROM (
+        SELECT p.id, p.nome, COALESCE(p.estoque, 0) AS estoque,
+               COALESCE(cp.saldo, 0) + COALESCE((
+                   SELECT SUM(m.quantidade) FROM stock_movement m
+                   WHERE m.produto_id = p.id AND m.id > COALESCE(cp.movimento_id, 0)
+               ), 0) AS saldo
+        FROM product p
+        LEFT JOIN stock_checkpoint cp ON cp.id = (
+            SELECT id FROM stock_checkpoint WHERE produto_id = p.id ORDER BY movimento_id DESC LIMIT 1
+        )
+    ) WHERE estoque != saldo ORDER BY id
+""")
+
+def criar_checkpoints(minimo=1):
+    """Cria checkpoints para os produtos com `minimo` movimentos novos; retorna quantos."""
+    criados = db.session.execute(_CHECKPOINT, {'minimo': minimo}).rowcount
+    db.session.commit()
+    return criados
+
+def saldo_em(produto_id, quando):
+    """Estoque do produto no instante `quando`, pelo registro de movimentos.
+
+    Parte do último checkpoint anterior a `quando` e soma só os movimentos
+    seguintes, em vez de todo o histórico do produto.
+    """
+    checkpoint = StockCheckpoint.query.filter(
+        StockCheckpoint.produto_id == produto_id,
+        StockCheckpoint.created_at <= quando
+    ).order_by(StockCheckpoint.movimento_id.desc()).first()
+    query = db.session.query(func.coalesce(func.sum(StockMovement.quantidade), 0)).filter(
+        StockMovement.produto_id == produto_id,
+        StockMovement.created_at <= quando
+    )
+    if checkpoint is None:
+        return query.scalar()
+    return checkpoint.saldo + query.filter(StockMovement.id > checkpoint.movimento_id).scalar()
+
+def divergencias():
+    """Produtos cujo estoque não bate com o registro: [(id, nome, estoque, saldo)]."""
+    return db.session.execute(_DIVERGENCIAS).all()
+
+def reconciliar():
+    """Registra um ajuste para cada divergência, assumindo o estoque atual como correto."""
+    linhas = divergencias()
+    registrar([movimento(d.id, AJUSTE, d.estoque - d.saldo, observacao='reconciliação') for d in linhas])
+    db.session.commit()
+    return linhas
+
+@click.command('estoque-checkpoint')
+@click.option('--minimo', default=1, show_default=True, help='Movimentos novos necessários para criar o checkpoint.')
+@with_appcontext
+def checkpoint_command(minimo):
+    """Cria checkpoints de saldo do estoque (agendar periodicamente)."""
+    click.echo(f'{criar_checkpoints(minimo)} checkpoints criados.')
+
+@click.command('estoque-verificar')
+@click.option('--corrigir', is_flag=True, help='Registra ajustes para igualar o registro ao estoque atual.')
+@with_appcontext
+def verificar_command(corrigir):
+    """Confere Product.estoque contra o registro de movimentações."""
+    linhas = reconciliar() if corrigir else divergencias()
+    for d in linhas:
+        click.echo(f'produto {d.id} ({d.nome}): estoque {d.estoque}, registro {d.saldo}', err=True)
+    if not linhas:
+        click.echo('Estoque consistente com o registro de movimentações.')
+    elif corrigir:
+        click.echo(f'{len(linhas)} produtos ajustados.')
+    else:
+        raise SystemExit(1)
@@ -0,0 +1,96 @@
+import csv
+import tempfile
+from datetime import datetime, time, timedelta
+from sqlalchemy import select
+from . import db, reports
+from .models import Client, Product, Sale, Supplier
+
+# ---------- EXPORTAÇÃO EM STREAMING ----------
+# Cada exportação é um gerador de linhas (a primeira é o cabeçalho) lido do
+# banco em lotes com yield_per, então a memória do worker fica constante
+# independentemente do número de linhas.
+
+BATCH_SIZE = 1000
+MIMETYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+def _stream(stmt):
+    return db.session.execute(stmt.execution_options(yield_per=BATCH_SIZE))
+
+def linhas_vendas(inicio=None, fim=None):
+    yield ['id', 'data', 'cliente', 'produto', 'quantidade', 'total', 'pedido']
+    stmt = select(
+        Sale.id, Sale.created_at, Client.nome, Product.nome, Sale.quantidade, Sale.total, Sale.pedido_id
+    ).outerjoin(Client, Client.id == Sale.cliente_id).outerjoin(Product, Product.id == Sale.produto_id)
+    if inicio:
+        stmt = stmt.where(Sale.created_at >= datetime.combine(inicio, time.min))
+    if fim:
+        stmt = stmt.where(Sale.created_at < datetime.combine(fim + timedelta(days=1), time.min))
+    for row in _stream(stmt.order_by(Sale.created_at, Sale.id)):
+        yield [row[0], row[1].strftime('%Y-%m-%d %H:%M:%S'), *row[2:]]
+
+def linhas_clientes(inicio=None, fim=None):
+    yield ['id', 'nome', 'email', 'telefone', 'criado_em']
+    stmt = select(Client.id, Client.nome, Client.email, Client.telefone, Client.created_at).order_by(Client.id)
+    yield from _stream(stmt)
+
+def linhas_produtos(inicio=None, fim=None):
+    yield ['id', 'nome', 'preco', 'estoque', 'estoque_minimo', 'fornecedor', 'criado_em']
+    stmt = select(
+        Product.id, Product.nome, Product.preco, Product.estoque, Product.estoque_minimo, Supplier.nome,
+        Product.created_at
+    ).outerjoin(Supplier, Supplier.id == Product.fornecedor_id).order_by(Product.id)
+    yield from _stream(stmt)
+
+def linhas_vendas_mensais(inicio=None, fim=None):
+    yield ['mes', 'total']
+    yield from reports.vendas_mensais(inicio, fim)
+
+def linhas_produtos_mais_vendidos(inicio=None, fim=None):
+    yield ['produto', 'quantidade']
+    yield from reports.produtos_mais_vendidos(inicio, fim, limit=None)
+
+def linhas_clientes_top(inicio=None, fim=None):
+    yield ['cliente', 'total']
+    yield from reports.clientes_top(inicio, fim, limit=None)
+
+EXPORTACOES = {
+    'vendas': linhas_vendas,
+    'clientes': linhas_clientes,
+    'produtos': linhas_produtos,
+    'vendas-mensais': linhas_vendas_mensais,
+    'produtos-mais-vendidos': linhas_produtos_mais_vendidos,
+    'clientes-top': linhas_clientes_top,
+}
+
+# ---------- FORMATOS ----------
+class _Linha:
+    """Destino do csv.writer que apenas devolve a linha formatada."""
+    def write(self, valor):
+        return valor
+
+def gerar_csv(linhas):
+    writer = csv.writer(_Linha())
+    yield '\ufeff'  # BOM para o Excel reconhecer UTF-8
+    for linha in linhas:
+        yield writer.writerow(['' if v is None else v for v in linha])
+
+def gerar_xlsx(linhas, titulo='dados', chunk_size=64 * 1024):
+    # openpyxl em modo write_only grava as linhas em arquivo temporário
+    # conforme chegam; o .xlsx final é enviado em blocos.
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(titulo[:31])
+    for linha in linhas:
+        ws.append(list(linha))
+    with tempfile.TemporaryFile() as arquivo:
+        wb.save(arquivo)
+        arquivo.seek(0)
+        while True:
+            bloco = arquivo.read(chunk_size)
+            if not bloco:
+                break
+            yield bloco
@@ -13,6 +13,7 @@ class ProductForm(FlaskForm):
     nome = StringField('Nome', validators=[DataRequired(), Length(min=2, max=120)])
     preco = DecimalField('Preço', validators=[DataRequired(), NumberRange(min=0)])
     estoque = IntegerField('Estoque', validators=[DataRequired(), NumberRange(min=0)])
+    estoque_minimo = IntegerField('Estoque mínimo', default=0, validators=[Optional(), NumberRange(min=0)])
     fornecedor = SelectField('Fornecedor', coerce=int, validators=[DataRequired()])
     descricao = TextAreaField('Descrição')
     submit = SubmitField('Salvar Produto')
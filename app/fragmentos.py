@@ -0,0 +1,52 @@
+from flask_wtf.csrf import generate_csrf
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from . import versions
+from .cache import fragment_cache
+
+# ---------- CACHE DE FRAGMENTOS DE TEMPLATE ----------
+# {% cache 'clientes', versoes('client') %} ... {% endcache %}
+#
+# O HTML do bloco fica no fragment_cache com a chave (template, argumentos).
+# As versões das tabelas entram na chave, então qualquer escrita gera uma
+# chave nova e as antigas saem pelo TTL/LRU. As views passam consultas ainda
+# não executadas: num acerto, o bloco não é renderizado e a consulta não roda.
+#
+# O fragmento é o mesmo para todos os usuários e não pode levar nada da
+# sessão. O token CSRF é gravado como marcador (csrf_fragmento()) e trocado
+# pelo token de quem fez a requisição na saída.
+
+MARCADOR_CSRF = '\x00csrf\x00'
+
+class FragmentCache(Extension):
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        chamada = self.call_method('_renderizar', [nodes.Const(parser.name), nodes.Tuple(args, 'load')])
+        return nodes.CallBlock(chamada, [], [], body).set_lineno(lineno)
+
+    def _renderizar(self, template, args, caller):
+        chave = (template, *args)
+        html = fragment_cache.get(chave)
+        if html is None:
+            html = str(caller())
+            fragment_cache.set(chave, html)
+        if MARCADOR_CSRF in html:
+            html = html.replace(MARCADOR_CSRF, generate_csrf())
+        return Markup(html)
+
+def csrf_fragmento():
+    return Markup(MARCADOR_CSRF)
+
+def versoes(*tabelas):
+    return versions.atuais(*tabelas)
+
+def init_app(app):
+    app.jinja_env.add_extension(FragmentCache)
+    app.jinja_env.globals.update(csrf_fragmento=csrf_fragmento, versoes=versoes)
@@ -0,0 +1,124 @@
+import csv
+import time
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import insert
+from werkzeug.datastructures import MultiDict
+from . import db, estoque
+from .cache import metrics_cache, CLIENTES_KEYS, PRODUTOS_KEYS, FORNECEDORES_KEYS
+from .forms import ClientForm, ProductForm, SupplierForm
+from .models import Client, Product, Supplier
+
+# ---------- IMPORTAÇÃO EM LOTE (CSV) ----------
+# O arquivo é lido linha a linha; cada linha é validada pelo mesmo formulário
+# usado no cadastro manual e as válidas são gravadas em lote (executemany)
+# em transações de BATCH_SIZE linhas.
+
+BATCH_SIZE = 1000
+MAX_ERROS_RELATORIO = 1000
+
+IMPORTACOES = {
+    'clientes': {'model': Client, 'form': ClientForm, 'campos': ('nome', 'email', 'telefone', 'notas'),
+                 'cache': CLIENTES_KEYS},
+    'produtos': {'model': Product, 'form': ProductForm,
+                 'campos': ('nome', 'preco', 'estoque', 'estoque_minimo', 'fornecedor', 'descricao'),
+                 'cache': PRODUTOS_KEYS},
+    'fornecedores': {'model': Supplier, 'form': SupplierForm, 'campos': ('nome', 'email', 'telefone', 'endereco'),
+                     'cache': FORNECEDORES_KEYS},
+}
+
+def _fornecedores_por_nome():
+    # Uma única consulta para resolver todos os nomes do arquivo
+    return {nome.strip().casefold(): sid for sid, nome in db.session.query(Supplier.id, Supplier.nome)}
+
+def _validar(tipo, linha, fornecedores):
+    """Retorna (mapping, None) se a linha for válida ou (None, [erros])."""
+    config = IMPORTACOES[tipo]
+    dados = {campo: (linha.get(campo) or '').strip() for campo in config['campos']}
+
+    if tipo == 'produtos':
+        nome_fornecedor = dados['fornecedor']
+        fornecedor_id = fornecedores.get(nome_fornecedor.casefold()) if nome_fornecedor else None
+        if nome_fornecedor and fornecedor_id is None:
+            return None, [f'fornecedor: "{nome_fornecedor}" não encontrado']
+        dados['fornecedor'] = str(fornecedor_id) if fornecedor_id else ''
+
+    form = config['form'](formdata=MultiDict(dados), meta={'csrf': False})
+    if tipo == 'produtos':
+        form.fornecedor.choices = [(int(dados['fornecedor']), '')] if dados['fornecedor'] else []
+    if not form.validate():
+        return None, [f'{campo}: {", ".join(msgs)}' for campo, msgs in form.errors.items()]
+
+    mapping = {campo: form[campo].data for campo in config['campos'] if campo != 'fornecedor'}
+    if tipo == 'produtos':
+        mapping['estoque_minimo'] = mapping['estoque_minimo'] or 0
+        mapping['fornecedor_id'] = form.fornecedor.data
+    return mapping, None
+
+def importar(tipo, arquivo, batch_size=BATCH_SIZE, progresso=None):
+    """Importa um CSV (objeto de texto iterável) com cabeçalho.
+
+    Retorna um dict com o total inserido, os erros por linha (até
+    MAX_ERROS_RELATORIO) e a vazão em linhas por segundo. progresso, se
+    dado, é chamado com o número de linhas lidas após cada lote gravado.
+    """
+    config = IMPORTACOES[tipo]
+    fornecedores = _fornecedores_por_nome() if tipo == 'produtos' else {}
+    inicio = time.perf_counter()
+    inseridos = 0
+    total_erros = 0
+    erros = []
+    lote = []
+
+    def gravar():
+        nonlocal inseridos, lote
+        if lote:
+            if tipo == 'produtos':
+                # executemany sem RETURNING; as entradas de estoque saem de um INSERT ... SELECT
+                db.session.execute(insert(Product), lote)
+                estoque.registrar_importacao(len(lote))
+            else:
+                db.session.bulk_insert_mappings(config['model'], lote)
+            db.session.commit()
+            inseridos += len(lote)
+            lote = []
+            if progresso:
+                progresso(inseridos + total_erros)
+
+    # A linha 1 é o cabeçalho; numeramos como no editor de planilhas
+    for numero, linha in enumerate(csv.DictReader(arquivo), start=2):
+        mapping, mensagens = _validar(tipo, linha, fornecedores)
+        if mensagens:
+            total_erros += 1
+            if len(erros) < MAX_ERROS_RELATORIO:
+                erros.append({'linha': numero, 'erros': mensagens})
+            continue
+        lote.append(mapping)
+        if len(lote) >= batch_size:
+            gravar()
+    gravar()
+
+    if inseridos:
+        metrics_cache.invalidate(*config['cache'])
+    segundos = time.perf_counter() - inicio
+    return {
+        'tipo': tipo,
+        'inseridos': inseridos,
+        'total_erros': total_erros,
+        'erros': erros,
+        'segundos': round(segundos, 3),
+        'linhas_por_segundo': round((inseridos + total_erros) / segundos, 1) if segundos else 0.0,
+    }
+
+@click.command('importar')
+@click.argument('tipo', type=click.Choice(list(IMPORTACOES)))
+@click.argument('arquivo', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--batch-size', default=BATCH_SIZE, show_default=True, help='Linhas por transação.')
+@with_appcontext
+def importar_command(tipo, arquivo, batch_size):
+    """Importa clientes, produtos ou fornecedores de um arquivo CSV."""
+    resultado = importar(tipo, arquivo, batch_size=batch_size)
+    for erro in resultado['erros']:
+        click.echo(f"linha {erro['linha']}: {'; '.join(erro['erros'])}", err=True)
+    click.echo(f"{resultado['inseridos']} registros importados, {resultado['total_erros']} com erro, "
+               f"{resultado['linhas_por_segundo']} linhas/s")
@@ -0,0 +1,145 @@
+import hmac
+import threading
+import time
+from flask import Response, abort, current_app, g, has_request_context, request
+from flask_login import current_user
+from sqlalchemy import event
+from . import db
+from .cache import metrics_cache
+
+# ---------- INSTRUMENTAÇÃO (OPCIONAL) ----------
+# Ativada por INSTRUMENTATION_ENABLED. Mede latência por endpoint, número de
+# consultas e tempo de SQL por requisição, registra consultas lentas e avisa
+# quando uma requisição faz consultas demais (sinal típico de N+1). Os valores
+# são por processo e expostos em /metrics no formato texto do Prometheus.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+def _escape(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(nomes, valores):
+    if not nomes:
+        return ''
+    return '{' + ','.join(f'{n}="{_escape(v)}"' for n, v in zip(nomes, valores)) + '}'
+
+class Counter:
+    def __init__(self, nome, ajuda, labels=()):
+        self.nome, self.ajuda, self.labels = nome, ajuda, labels
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *valores, amount=1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + amount
+
+    def render(self):
+        linhas = [f'# HELP {self.nome} {self.ajuda}', f'# TYPE {self.nome} counter']
+        with self._lock:
+            for valores, total in sorted(self._valores.items()):
+                linhas.append(f'{self.nome}{_labels(self.labels, valores)} {total}')
+        return linhas
+
+class Histogram:
+    def __init__(self, nome, ajuda, buckets, labels=()):
+        self.nome, self.ajuda, self.buckets, self.labels = nome, ajuda, buckets, labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, valor, *valores):
+        with self._lock:
+            serie = self._series.setdefault(valores, {'buckets': [0] * len(self.buckets), 'soma': 0.0, 'total': 0})
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie['buckets'][i] += 1
+            serie['soma'] += valor
+            serie['total'] += 1
+
+    def render(self):
+        linhas = [f'# HELP {self.nome} {self.ajuda}', f'# TYPE {self.nome} histogram']
+        with self._lock:
+            for valores, serie in sorted(self._series.items()):
+                for limite, quantidade in zip(self.buckets, serie['buckets']):
+                    linhas.append(f"{self.nome}_bucket{_labels(self.labels + ('le',), valores + (limite,))} {quantidade}")
+                linhas.append(f"{self.nome}_bucket{_labels(self.labels + ('le',), valores + ('+Inf',))} {serie['total']}")
+                linhas.append(f"{self.nome}_sum{_labels(self.labels, valores)} {serie['soma']}")
+                linhas.append(f"{self.nome}_count{_labels(self.labels, valores)} {serie['total']}")
+        return linhas
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Latência das requisições por endpoint.',
+                            LATENCY_BUCKETS, ('endpoint', 'method'))
+REQUEST_QUERIES = Histogram('http_request_queries', 'Consultas SQL por requisição.', QUERY_BUCKETS, ('endpoint',))
+REQUEST_SQL_SECONDS = Counter('http_request_sql_seconds_total', 'Tempo total gasto em SQL por endpoint.', ('endpoint',))
+REQUESTS = Counter('http_requests_total', 'Requisições atendidas.', ('endpoint', 'method', 'status'))
+SLOW_QUERIES = Counter('db_slow_queries_total', 'Consultas acima de SLOW_QUERY_MS.')
+TOO_MANY_QUERIES = Counter('http_requests_too_many_queries_total',
+                           'Requisições acima de QUERY_COUNT_WARNING consultas.', ('endpoint',))
+
+METRICAS = (REQUEST_LATENCY, REQUEST_QUERIES, REQUEST_SQL_SECONDS, REQUESTS, SLOW_QUERIES, TOO_MANY_QUERIES)
+
+# ---------- GANCHOS ----------
+def _registrar_engine(engine, slow_query_ms, logger):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        # No contexto da execução, e não em conn.info: after_cursor_execute
+        # não roda quando o comando falha, e nada sobraria na conexão do pool
+        context._inst_inicio = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _depois(conn, cursor, statement, parameters, context, executemany):
+        duracao = time.perf_counter() - context._inst_inicio
+        if has_request_context() and 'inst_consultas' in g:
+            g.inst_consultas += 1
+            g.inst_sql_segundos += duracao
+        if duracao * 1000 >= slow_query_ms:
+            SLOW_QUERIES.inc()
+            logger.warning('Consulta lenta (%.1f ms): %s | parâmetros: %r', duracao * 1000, statement, parameters)
+
+def _before_request():
+    g.inst_inicio = time.perf_counter()
+    g.inst_consultas = 0
+    g.inst_sql_segundos = 0.0
+
+def _after_request(response):
+    if 'inst_inicio' not in g:
+        return response
+    endpoint = request.endpoint or 'desconhecido'
+    duracao = time.perf_counter() - g.inst_inicio
+    REQUEST_LATENCY.observe(duracao, endpoint, request.method)
+    REQUEST_QUERIES.observe(g.inst_consultas, endpoint)
+    REQUEST_SQL_SECONDS.inc(endpoint, amount=g.inst_sql_segundos)
+    REQUESTS.inc(endpoint, request.method, response.status_code)
+
+    limite = current_app.config['QUERY_COUNT_WARNING']
+    if g.inst_consultas > limite:
+        TOO_MANY_QUERIES.inc(endpoint)
+        current_app.logger.warning('%s %s fez %d consultas (limite %d); possível N+1',
+                                   request.method, request.path, g.inst_consultas, limite)
+    return response
+
+def metrics():
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        enviado = request.headers.get('Authorization', '').encode()
+        if not hmac.compare_digest(enviado, f'Bearer {token}'.encode()):
+            abort(401)
+    elif not current_user.is_authenticated:
+        abort(401)
+
+    linhas = []
+    for metrica in METRICAS:
+        linhas.extend(metrica.render())
+    stats = metrics_cache.stats()
+    linhas += ['# HELP metrics_cache_hits_total Acertos do cache do dashboard.', '# TYPE metrics_cache_hits_total counter',
+               f"metrics_cache_hits_total {stats['hits']}",
+               '# HELP metrics_cache_misses_total Faltas do cache do dashboard.', '# TYPE metrics_cache_misses_total counter',
+               f"metrics_cache_misses_total {stats['misses']}"]
+    return Response('\n'.join(linhas) + '\n', mimetype='text/plain; version=0.0.4')
+
+def init_app(app):
+    """Liga a instrumentação ao app e ao engine. Chamar dentro do app context."""
+    _registrar_engine(db.engine, app.config['SLOW_QUERY_MS'], app.logger)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule('/metrics', 'metrics', metrics)
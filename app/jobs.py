@@ -0,0 +1,205 @@
+import csv
+import json
+import multiprocessing
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select, update
+from sqlalchemy.exc import OperationalError
+from . import db, export, importer
+from .models import Job
+from .sales import com_retry
+
+# ---------- FILA DE TAREFAS EM SEGUNDO PLANO ----------
+# As requisições só gravam uma linha em Job e respondem; o trabalho pesado é
+# feito pelos processos do `flask jobs-worker`, que disputam a fila com um
+# UPDATE condicional (o mesmo padrão de baixar_estoque_em_lote), então cada tarefa é
+# executada por um único worker. O resultado fica em JOBS_DIR para download.
+
+PENDENTE = 'pendente'
+EXECUTANDO = 'executando'
+CONCLUIDO = 'concluido'
+ERRO = 'erro'
+FINALIZADOS = (CONCLUIDO, ERRO)
+
+INTERVALO_PROGRESSO = 1000  # linhas entre atualizações de progresso
+
+def diretorio():
+    caminho = current_app.config['JOBS_DIR'] or os.path.join(current_app.instance_path, 'jobs')
+    os.makedirs(caminho, exist_ok=True)
+    return caminho
+
+def _data(valor):
+    return datetime.strptime(valor, '%Y-%m-%d').date() if valor else None
+
+# ---------- ENFILEIRAMENTO ----------
+def enfileirar(tipo, parametros, usuario_id):
+    if tipo not in TAREFAS:
+        raise ValueError(f'Tipo de tarefa desconhecido: {tipo}')
+    job = Job(tipo=tipo, parametros=json.dumps(parametros), usuario_id=usuario_id)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+def salvar_upload(arquivo):
+    """Grava o arquivo enviado em JOBS_DIR e retorna o caminho."""
+    caminho = os.path.join(diretorio(), f'upload-{uuid.uuid4().hex}.csv')
+    arquivo.save(caminho)
+    return caminho
+
+# ---------- TAREFAS ----------
+def _exportar(job, parametros, progresso):
+    recurso, formato = parametros['recurso'], parametros['formato']
+    linhas = export.EXPORTACOES[recurso](_data(parametros.get('inicio')), _data(parametros.get('fim')))
+
+    def contando(linhas):
+        # A primeira linha é o cabeçalho, então o índice é o total de dados já lidos
+        for numero, linha in enumerate(linhas):
+            if numero and numero % INTERVALO_PROGRESSO == 0:
+                progresso(numero)
+            job.processados = numero
+            yield linha
+
+    caminho = os.path.join(diretorio(), f'job-{job.id}.{formato}')
+    if formato == 'csv':
+        with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+            for parte in export.gerar_csv(contando(linhas)):
+                arquivo.write(parte)
+    else:
+        with open(caminho, 'wb') as arquivo:
+            for bloco in export.gerar_xlsx(contando(linhas), recurso):
+                arquivo.write(bloco)
+    job.arquivo = caminho
+    job.nome_arquivo = f'{recurso}.{formato}'
+    job.mimetype = export.MIMETYPES[formato]
+
+def _importar(job, parametros, progresso):
+    caminho = parametros['arquivo']
+    try:
+        with open(caminho, encoding='utf-8-sig', newline='') as arquivo:
+            progresso(0, max(sum(1 for _ in csv.reader(arquivo)) - 1, 0))
+        with open(caminho, encoding='utf-8-sig', newline='') as arquivo:
+            resultado = importer.importar(parametros['tipo'], arquivo, progresso=progresso)
+    except UnicodeDecodeError:
+        raise ValueError('O arquivo deve estar em UTF-8')
+    finally:
+        os.remove(caminho)
+    job.processados = resultado['inseridos'] + resultado['total_erros']
+    job.resultado = json.dumps(resultado, ensure_ascii=False)
+
+TAREFAS = {
+    'exportar': _exportar,
+    'importar': _importar,
+}
+
+# ---------- EXECUÇÃO ----------
+@com_retry
+def reservar(worker):
+    """Passa a tarefa pendente mais antiga para 'executando' e retorna seu id (None se a fila estiver vazia)."""
+    proxima = select(Job.id).where(Job.status == PENDENTE).order_by(Job.id).limit(1).scalar_subquery()
+    stmt = update(Job).where(Job.id == proxima, Job.status == PENDENTE).values(
+        status=EXECUTANDO, worker=worker, iniciado_em=datetime.utcnow()
+    ).returning(Job.id)
+    job_id = db.session.execute(stmt, execution_options={'synchronize_session': False}).scalar()
+    db.session.commit()
+    return job_id
+
+def _progresso(job_id):
+    # Conexão própria: a sessão pode estar no meio de uma leitura em streaming.
+    # O progresso é informativo, então um lock ocupado apenas pula a atualização.
+    def atualizar(processados, total=None):
+        valores = {'processados': processados}
+        if total is not None:
+            valores['total'] = total
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(update(Job).where(Job.id == job_id).values(**valores))
+        except OperationalError:
+            current_app.logger.warning('Progresso da tarefa %s não atualizado', job_id)
+    return atualizar
+
+def executar(job_id):
+    job = db.session.get(Job, job_id)
+    try:
+        TAREFAS[job.tipo](job, json.loads(job.parametros), _progresso(job_id))
+        job.status = CONCLUIDO
+    except Exception as e:
+        current_app.logger.exception('Tarefa %s falhou', job_id)
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        job.status = ERRO
+        job.erro = str(e) or type(e).__name__
+    job.concluido_em = datetime.utcnow()
+    db.session.commit()
+
+def trabalhar(intervalo=1.0, uma_vez=False):
+    """Laço de um worker: executa tarefas até a fila esvaziar (uma_vez) ou para sempre."""
+    worker = f'{socket.gethostname()}:{os.getpid()}'
+    while True:
+        job_id = reservar(worker)
+        if job_id is None:
+            if uma_vez:
+                return
+            time.sleep(intervalo)
+            continue
+        executar(job_id)
+        db.session.remove()
+
+def recuperar():
+    """Devolve à fila tarefas interrompidas (ex.: workers encerrados no meio)."""
+    n = Job.query.filter_by(status=EXECUTANDO).update(
+        {'status': PENDENTE, 'worker': None, 'iniciado_em': None}, synchronize_session=False)
+    db.session.commit()
+    return n
+
+def limpar(dias):
+    """Remove tarefas finalizadas há mais de `dias` dias e os arquivos delas."""
+    limite = datetime.utcnow() - timedelta(days=dias)
+    antigas = Job.query.filter(Job.status.in_(FINALIZADOS), Job.concluido_em < limite).all()
+    for job in antigas:
+        if job.arquivo and os.path.exists(job.arquivo):
+            os.remove(job.arquivo)
+        db.session.delete(job)
+    db.session.commit()
+    return len(antigas)
+
+def _processo(intervalo, uma_vez):
+    # Processos criados com spawn: cada um monta o próprio app (APP_CONFIG)
+    # e, com ele, o próprio pool de conexões.
+    from . import create_app
+    app = create_app()
+    with app.app_context():
+        trabalhar(intervalo, uma_vez)
+
+@click.command('jobs-worker')
+@click.option('--processos', type=int, help='Número de processos (padrão: JOBS_PROCESSES).')
+@click.option('--intervalo', type=float, help='Segundos entre consultas à fila vazia (padrão: JOBS_POLL_SECONDS).')
+@click.option('--uma-vez', is_flag=True, help='Processa as tarefas pendentes e sai.')
+@with_appcontext
+def worker_command(processos, intervalo, uma_vez):
+    """Executa as tarefas em segundo plano (exportações e importações)."""
+    processos = processos or current_app.config['JOBS_PROCESSES']
+    intervalo = intervalo or current_app.config['JOBS_POLL_SECONDS']
+    recuperadas = recuperar()
+    removidas = limpar(current_app.config['JOBS_RETENTION_DAYS'])
+    click.echo(f'{recuperadas} tarefas devolvidas à fila, {removidas} antigas removidas; '
+               f'iniciando {processos} processo(s).')
+
+    if processos == 1:
+        trabalhar(intervalo, uma_vez)
+        return
+    contexto = multiprocessing.get_context('spawn')
+    filhos = [contexto.Process(target=_processo, args=(intervalo, uma_vez)) for _ in range(processos)]
+    for filho in filhos:
+        filho.start()
+    try:
+        for filho in filhos:
+            filho.join()
+    except KeyboardInterrupt:
+        for filho in filhos:
+            filho.terminate()
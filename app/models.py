@@ -1,4 +1,6 @@
-from . import db, login_manager
+from . import db
+from .money import Dinheiro
+from flask import current_app
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
@@ -11,15 +13,12 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        # Método e custo vêm de PASSWORD_HASH_METHOD; hashes antigos são refeitos no login
+        self.password_hash = generate_password_hash(password, method=current_app.config['PASSWORD_HASH_METHOD'])
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
-
 class Client(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(120), nullable=False)
@@ -40,19 +39,135 @@ class Supplier(db.Model):
 class Product(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(120), nullable=False)
-    preco = db.Column(db.Float, nullable=False)
+    preco = db.Column(Dinheiro, nullable=False)
     descricao = db.Column(db.Text)
     estoque = db.Column(db.Integer, default=0)  # NOVO: Campo de estoque
+    estoque_minimo = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Ponto de reposição
     fornecedor_id = db.Column(db.Integer, db.ForeignKey('supplier.id'))  # NOVO: Relacionamento com Fornecedor
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Índice parcial: contém só os produtos no ponto de reposição ou abaixo.
+    # O SQLite o atualiza a cada escrita em estoque/estoque_minimo, então a
+    # consulta de reposição (estoque.py) nunca percorre o catálogo inteiro.
+    __table_args__ = (
+        db.Index('ix_product_estoque_baixo', 'fornecedor_id', 'estoque',
+                 sqlite_where=db.text('estoque <= estoque_minimo')),
+    )
+
+class SaleOrder(db.Model):
+    # Pedido com vários itens; cada item é uma linha de Sale com pedido_id
+    id = db.Column(db.Integer, primary_key=True)
+    cliente_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False)
+    total = db.Column(Dinheiro, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    cliente = db.relationship('Client', backref='pedidos')
+    itens = db.relationship('Sale', backref='pedido', lazy=True)
+
 class Sale(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     cliente_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False)
     produto_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     quantidade = db.Column(db.Integer, nullable=False)
-    total = db.Column(db.Float, nullable=False)
+    total = db.Column(Dinheiro, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    pedido_id = db.Column(db.Integer, db.ForeignKey('sale_order.id'), index=True)
 
     cliente = db.relationship('Client', backref='sales')
-    produto = db.relationship('Product', backref='sales')
\ No newline at end of file
+    produto = db.relationship('Product', backref='sales')
+
+    # Índices compostos para a paginação por cursor em /vendas (com e sem filtro)
+    __table_args__ = (
+        db.Index('ix_sale_created_at_id', 'created_at', 'id'),
+        db.Index('ix_sale_cliente_created_at_id', 'cliente_id', 'created_at', 'id'),
+        db.Index('ix_sale_produto_created_at_id', 'produto_id', 'created_at', 'id'),
+    )
+
+# ---------- TABELAS DE RESUMO (ROLLUP) DE VENDAS ----------
+# Mantidas incrementalmente por nova_venda/deletar_venda (ver rollups.py).
+# Os relatórios leem destas tabelas, então o custo depende do número de dias
+# no período e não do número de vendas.
+class SaleDaily(db.Model):
+    dia = db.Column(db.Date, primary_key=True)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(Dinheiro, nullable=False, default=0)
+    vendas = db.Column(db.Integer, nullable=False, default=0)
+
+class SaleDailyProduct(db.Model):
+    dia = db.Column(db.Date, primary_key=True)
+    produto_id = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(Dinheiro, nullable=False, default=0)
+    vendas = db.Column(db.Integer, nullable=False, default=0)
+
+class SaleDailyClient(db.Model):
+    dia = db.Column(db.Date, primary_key=True)
+    cliente_id = db.Column(db.Integer, db.ForeignKey('client.id'), primary_key=True)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(Dinheiro, nullable=False, default=0)
+    vendas = db.Column(db.Integer, nullable=False, default=0)
+
+
+# ---------- VERSÕES DAS TABELAS ----------
+# Um contador por tabela, incrementado por gatilhos do SQLite a cada escrita
+# (ver versions.py). Serve de chave para ETags e caches de resposta.
+class TableVersion(db.Model):
+    tabela = db.Column(db.String(64), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+
+
+# ---------- MOVIMENTAÇÃO DE ESTOQUE ----------
+# Registro somente de inserção: cada alteração de Product.estoque grava uma
+# linha com a variação, na mesma transação (ver estoque.py). Os checkpoints
+# guardam o saldo acumulado de cada produto até um movimento, para calcular
+# o estoque em qualquer data sem somar o histórico inteiro.
+class StockMovement(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    produto_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    tipo = db.Column(db.String(16), nullable=False)
+    quantidade = db.Column(db.Integer, nullable=False)  # variação: negativa na venda
+    venda_id = db.Column(db.Integer)  # sem FK: a venda estornada é removida
+    usuario_id = db.Column(db.Integer)
+    observacao = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_stock_movement_produto_id', 'produto_id', 'id'),
+    )
+
+class StockCheckpoint(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    produto_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    movimento_id = db.Column(db.Integer, nullable=False)  # último movimento incluído no saldo
+    saldo = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)  # data do último movimento incluído
+
+    __table_args__ = (
+        db.Index('ix_stock_checkpoint_produto_movimento', 'produto_id', 'movimento_id'),
+    )
+
+# ---------- FILA DE TAREFAS EM SEGUNDO PLANO ----------
+# Tarefas pesadas (exportações, importações) executadas pelos workers do
+# comando `flask jobs-worker` (ver jobs.py).
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(32), nullable=False)
+    parametros = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.String(16), nullable=False, default='pendente')
+    processados = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer)
+    resultado = db.Column(db.Text)
+    erro = db.Column(db.Text)
+    arquivo = db.Column(db.String(255))
+    nome_arquivo = db.Column(db.String(255))
+    mimetype = db.Column(db.String(128))
+    usuario_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    worker = db.Column(db.String(64))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    iniciado_em = db.Column(db.DateTime)
+    concluido_em = db.Column(db.DateTime)
+
+    # A fila é lida sempre por status na ordem de chegada
+    __table_args__ = (
+        db.Index('ix_job_status_id', 'status', 'id'),
+    )
@@ -0,0 +1,38 @@
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy.types import Integer, TypeDecorator
+
+# ---------- DINHEIRO EM CENTAVOS ----------
+# Valores monetários são gravados como INTEGER (centavos) e lidos como
+# Decimal com duas casas. Somas no banco são inteiras e exatas; na aplicação
+# a aritmética é feita com Decimal, sem passar por float.
+
+CENTAVO = Decimal('0.01')
+
+def para_decimal(valor):
+    """Converte int, str, float ou Decimal em Decimal com duas casas (None passa direto)."""
+    if valor is None:
+        return None
+    if isinstance(valor, float):
+        # repr dá o menor texto que representa o float (2.675 e não 2.67499999...)
+        valor = repr(valor)
+    return Decimal(valor).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+def formatar(valor):
+    """R$ 1.234,56 direto do Decimal."""
+    texto = f'{para_decimal(valor or 0):,.2f}'
+    return 'R$ ' + texto.replace(',', 'X').replace('.', ',').replace('X', '.')
+
+class Dinheiro(TypeDecorator):
+    """Coluna INTEGER de centavos exposta como Decimal."""
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return int(para_decimal(value) * 100)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return Decimal(int(value)).scaleb(-2)
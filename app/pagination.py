@@ -0,0 +1,43 @@
+from datetime import datetime
+from sqlalchemy import tuple_
+
+# ---------- PAGINAÇÃO POR CURSOR (KEYSET) ----------
+# Em vez de OFFSET, cada página continua a partir da última linha vista
+# (created_at, id). Com um índice composto nessas colunas o custo de uma
+# página é o mesmo na primeira ou na milésima.
+
+CURSOR_SEP = '_'
+
+def encode_cursor(created_at, row_id):
+    return f'{created_at.isoformat()}{CURSOR_SEP}{row_id}'
+
+def decode_cursor(cursor):
+    """Retorna (created_at, id) ou None se o cursor for inválido."""
+    if not cursor:
+        return None
+    try:
+        ts, row_id = cursor.rsplit(CURSOR_SEP, 1)
+        return datetime.fromisoformat(ts), int(row_id)
+    except ValueError:
+        return None
+
+def keyset_page(query, created_col, id_col, cursor=None, per_page=50):
+    """Aplica a busca por cursor em ordem decrescente e retorna (itens, próximo_cursor).
+
+    Busca per_page + 1 linhas para saber se existe uma próxima página sem
+    precisar de um COUNT(*).
+    """
+    position = decode_cursor(cursor)
+    if position:
+        ts, row_id = position
+        # (created_at, id) < (ts, id) como valor de linha: o SQLite faz um SEARCH
+        # no índice a partir do cursor; com OR ele varre o índice desde o topo
+        query = query.filter(tuple_(created_col, id_col) < (ts, row_id))
+
+    rows = query.order_by(created_col.desc(), id_col.desc()).limit(per_page + 1).all()
+    items = rows[:per_page]
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return items, next_cursor
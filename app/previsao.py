@@ -0,0 +1,133 @@
+import math
+from collections import namedtuple
+from datetime import datetime, timedelta
+from flask import current_app
+from . import db, versions
+from .cache import previsao_cache
+from .estoque import SEM_FORNECEDOR
+from .models import Product, Supplier
+
+# ---------- PREVISÃO DE DEMANDA ----------
+# Tudo sai de duas leituras em bloco: os resumos diários por produto
+# (sale_daily_product) do histórico e as colunas de estoque de product, cada
+# uma direto para um array NumPy. As médias são calculadas para todos os
+# produtos de uma vez com np.bincount sobre as linhas existentes (dias sem
+# venda valem zero), sem montar a matriz produtos x dias nem laço por produto.
+#
+# A suavização exponencial s_t = a*x_t + (1-a)*s_(t-1), partindo de zero no
+# início do histórico, é a soma de a*(1-a)^(idade-1)*x das vendas de cada
+# produto, onde idade = 1 para ontem. O dia de hoje fica de fora por ser parcial.
+# Como os pesos caem geometricamente, só são lidos os dias com peso acima de
+# TOLERANCIA (cerca de 130 dias com a = 0.1), limitados a PREVISAO_HISTORICO_DIAS:
+# o restante do histórico mudaria a previsão em menos de uma parte por milhão.
+#
+# Reposição (s, S): o ponto de pedido é a demanda do prazo de entrega mais o
+# estoque mínimo; ao atingi-lo, sugere-se pedir até cobrir também
+# PREVISAO_COBERTURA_DIAS de demanda.
+#
+# O resultado fica no previsao_cache com as versões de sale_daily_product,
+# product e supplier na chave: vale até a próxima venda ou alteração de
+# estoque (e até a virada do dia).
+
+MAX_IDS_NOMES = 500
+TOLERANCIA = 1e-6
+
+Sugestao = namedtuple('Sugestao', 'id nome fornecedor_id fornecedor estoque estoque_minimo '
+                                  'media_movel demanda dias_restantes sugerido')
+
+_VENDAS = """
+    SELECT produto_id, CAST(julianday(:hoje) - julianday(dia) AS INTEGER), quantidade
+    FROM sale_daily_product WHERE dia >= :inicio AND dia < :hoje
+"""
+_PRODUTOS = 'SELECT id, COALESCE(estoque, 0), estoque_minimo, COALESCE(fornecedor_id, 0) FROM product ORDER BY id'
+
+def parametros():
+    config = current_app.config
+    return {
+        'alpha': config['PREVISAO_ALPHA'],
+        'janela': config['PREVISAO_JANELA_DIAS'],
+        'historico': config['PREVISAO_HISTORICO_DIAS'],
+        'prazo': config['PREVISAO_PRAZO_DIAS'],
+        'cobertura': config['PREVISAO_COBERTURA_DIAS'],
+    }
+
+def _ler(np, sql, dtype, params=None):
+    """Lê o resultado da consulta direto para um array estruturado (sem objetos Row)."""
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.execute(sql, params or {})
+        return np.fromiter(cursor, dtype=dtype)
+    finally:
+        cursor.close()
+
+def _alcance(alpha, janela, historico):
+    """Dias de histórico lidos: até o peso da suavização ficar abaixo de TOLERANCIA."""
+    dias = math.ceil(math.log(TOLERANCIA) / math.log(1 - alpha)) if 0 < alpha < 1 else 1
+    return min(historico, max(janela, dias))
+
+def _calcular(hoje, alpha, janela, historico, prazo, cobertura):
+    import numpy as np
+
+    inicio = hoje - timedelta(days=_alcance(alpha, janela, historico))
+    vendas = _ler(np, _VENDAS, [('produto', 'i8'), ('idade', 'i4'), ('quantidade', 'f8')],
+                  {'hoje': hoje.isoformat(), 'inicio': inicio.isoformat()})
+    produtos = _ler(np, _PRODUTOS, [('id', 'i8'), ('estoque', 'i8'), ('minimo', 'i8'), ('fornecedor', 'i8')])
+    n = len(produtos)
+    if not n:
+        return []
+
+    # Posição de cada linha de venda no array de produtos (ordenado por id);
+    # resumos de produtos já removidos são descartados
+    pos = np.searchsorted(produtos['id'], vendas['produto'])
+    validas = pos < n
+    validas[validas] = produtos['id'][pos[validas]] == vendas['produto'][validas]
+    pos, idade, quantidade = pos[validas], vendas['idade'][validas], vendas['quantidade'][validas]
+
+    recentes = idade <= janela
+    media_movel = np.bincount(pos[recentes], weights=quantidade[recentes], minlength=n) / janela
+    pesos = alpha * np.power(1 - alpha, idade - 1)
+    demanda = np.bincount(pos, weights=quantidade * pesos, minlength=n)
+
+    estoque = produtos['estoque']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dias_restantes = np.where(demanda > 0, np.maximum(estoque, 0) / demanda, np.inf)
+    ponto_pedido = demanda * prazo + produtos['minimo']
+    sugerido = np.ceil(ponto_pedido + demanda * cobertura - estoque).astype('i8')
+    repor = np.flatnonzero((estoque <= ponto_pedido) & (sugerido > 0))
+
+    # Por fornecedor e, dentro dele, quem acaba primeiro
+    repor = repor[np.lexsort((dias_restantes[repor], produtos['fornecedor'][repor]))]
+    nomes = _nomes(produtos['id'][repor].tolist())
+    return [
+        Sugestao(
+            id=pid, nome=nomes[pid][0], fornecedor_id=nomes[pid][1], fornecedor=nomes[pid][2],
+            estoque=int(estoque[i]), estoque_minimo=int(produtos['minimo'][i]),
+            media_movel=round(float(media_movel[i]), 2), demanda=round(float(demanda[i]), 2),
+            dias_restantes=None if math.isinf(dias_restantes[i]) else round(float(dias_restantes[i]), 1),
+            sugerido=int(sugerido[i]),
+        )
+        for i, pid in zip(repor.tolist(), produtos['id'][repor].tolist())
+    ]
+
+def _nomes(ids):
+    """{id: (nome, fornecedor_id, fornecedor)} dos produtos sugeridos."""
+    query = db.session.query(Product.id, Product.nome, Product.fornecedor_id, Supplier.nome).outerjoin(
+        Supplier, Supplier.id == Product.fornecedor_id)
+    if len(ids) <= MAX_IDS_NOMES:
+        query = query.filter(Product.id.in_(ids))
+    return {pid: (nome, fornecedor_id, fornecedor or SEM_FORNECEDOR)
+            for pid, nome, fornecedor_id, fornecedor in query}
+
+def dia_base():
+    """Dia da previsão: a janela de suavização anda a cada dia, mesmo sem escritas."""
+    return datetime.utcnow().date()
+
+def sugestoes(fornecedor_id=None):
+    """Produtos a repor pela previsão, ordenados por fornecedor e dias restantes."""
+    params = parametros()
+    hoje = dia_base()
+    chave = (hoje, versions.atuais('sale_daily_product', 'product', 'supplier'), tuple(sorted(params.items())))
+    linhas = previsao_cache.get_or_set(chave, lambda: _calcular(hoje, **params))
+    if fornecedor_id is not None:
+        linhas = [s for s in linhas if s.fornecedor_id == fornecedor_id]
+    return linhas
@@ -0,0 +1,154 @@
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.sql import func
+from . import db
+from .cache import report_cache
+from .models import Client, Product, SaleDaily, SaleDailyClient, SaleDailyProduct, TableVersion
+
+# ---------- RELATÓRIOS INCREMENTAIS ----------
+# Os relatórios são montados mês a mês a partir dos resumos diários. Meses já
+# encerrados e cobertos por inteiro pelo período ficam no report_cache como
+# resultados imutáveis; só as pontas (meses parciais e o mês corrente) são
+# calculadas na hora e somadas a eles.
+#
+# A chave de cada mês leva o contador 'relatorio:AAAA-MM' de table_version,
+# incrementado por gatilho quando uma venda daquele mês é removida ou
+# alterada, e o contador global 'relatorio:*', incrementado pelo
+# rebuild-rollups. Vendas novas sempre caem no mês corrente, que nunca é
+# guardado, então inserções não precisam invalidar nada.
+
+PREFIXO_VERSAO = 'relatorio:'
+VERSAO_GLOBAL = PREFIXO_VERSAO + '*'
+MAX_IDS_NOMES = 500
+
+MesTotal = namedtuple('MesTotal', 'mes total_mes')
+ProdutoQuantidade = namedtuple('ProdutoQuantidade', 'nome total_quantidade')
+ClienteGasto = namedtuple('ClienteGasto', 'nome total_gasto')
+
+# Mês sem nenhum resumo: (total, {produto_id: quantidade}, {cliente_id: total})
+_VAZIO = (None, {}, {})
+
+def invalidar_tudo():
+    """Descarta todos os meses guardados (em todos os processos). Não faz commit."""
+    stmt = sqlite_insert(TableVersion).values(tabela=VERSAO_GLOBAL, versao=1)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['tabela'], set_={'versao': TableVersion.versao + 1}))
+
+# ---------- AGREGAÇÃO ----------
+def _fim_do_mes(dia):
+    return (dia.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+
+def _agregar(intervalos):
+    """Agrega os resumos dos intervalos [inicio, fim] por mês, em três consultas."""
+    meses = {}
+
+    def consulta(model, *colunas):
+        mes = func.strftime('%Y-%m', model.dia)
+        filtro = or_(*[model.dia.between(inicio, fim) for inicio, fim in intervalos])
+        return db.session.query(mes, *colunas).filter(filtro).group_by(mes, *colunas[:-1])
+
+    for mes, total in consulta(SaleDaily, func.sum(SaleDaily.total)):
+        meses[mes] = (total, {}, {})
+    for mes, produto_id, quantidade in consulta(SaleDailyProduct, SaleDailyProduct.produto_id,
+                                                func.sum(SaleDailyProduct.quantidade)):
+        meses.setdefault(mes, (None, {}, {}))[1][produto_id] = quantidade
+    for mes, cliente_id, total in consulta(SaleDailyClient, SaleDailyClient.cliente_id,
+                                           func.sum(SaleDailyClient.total)):
+        meses.setdefault(mes, (None, {}, {}))[2][cliente_id] = total
+    return meses
+
+def _meses_fechados(meses):
+    """Lê do cache (ou calcula de uma vez) os meses encerrados pedidos."""
+    if not meses:
+        return {}
+    chaves = [VERSAO_GLOBAL] + [PREFIXO_VERSAO + m for m in meses]
+    versoes = dict(db.session.query(TableVersion.tabela, TableVersion.versao)
+                   .filter(TableVersion.tabela.in_(chaves)).all())
+    global_ = versoes.get(VERSAO_GLOBAL, 0)
+
+    resultado, faltando = {}, []
+    for mes in meses:
+        chave = (mes, versoes.get(PREFIXO_VERSAO + mes, 0), global_)
+        valor = report_cache.get(chave)
+        if valor is None:
+            faltando.append((mes, chave))
+        else:
+            resultado[mes] = valor
+
+    if faltando:
+        inicio = datetime.strptime(faltando[0][0], '%Y-%m').date()
+        fim = _fim_do_mes(datetime.strptime(faltando[-1][0], '%Y-%m').date())
+        calculados = _agregar([(inicio, fim)])
+        for mes, chave in faltando:
+            valor = calculados.get(mes, _VAZIO)
+            report_cache.set(chave, valor)
+            resultado[mes] = valor
+    return resultado
+
+class Relatorio:
+    """Meses do período já agregados; os três relatórios saem daqui sem novas somas no banco."""
+
+    def __init__(self, meses):
+        self.meses = meses  # [(mes, (total, produtos, clientes))] em ordem
+
+    def vendas_mensais(self):
+        return [MesTotal(mes, total) for mes, (total, _, _) in self.meses if total is not None]
+
+    def produtos_mais_vendidos(self, limit=5):
+        soma = Counter()
+        for _, (_, produtos, _) in self.meses:
+            soma.update(produtos)
+        return _top(Product, soma, limit, ProdutoQuantidade)
+
+    def clientes_top(self, limit=5):
+        soma = Counter()
+        for _, (_, _, clientes) in self.meses:
+            soma.update(clientes)
+        return _top(Client, soma, limit, ClienteGasto)
+
+def _top(model, soma, limit, tipo):
+    ordenados = sorted(soma.items(), key=lambda item: item[1], reverse=True)
+    if limit is not None:
+        ordenados = ordenados[:limit]
+    query = db.session.query(model.id, model.nome)
+    if len(ordenados) <= MAX_IDS_NOMES:
+        query = query.filter(model.id.in_([i for i, _ in ordenados]))
+    nomes = dict(query.all())
+    return [tipo(nomes[i], valor) for i, valor in ordenados if i in nomes]
+
+def calcular(inicio=None, fim=None):
+    """Relatório de [inicio, fim] (datas inclusivas; None = sem limite)."""
+    menor, maior = db.session.query(func.min(SaleDaily.dia), func.max(SaleDaily.dia)).one()
+    if menor is None:
+        return Relatorio([])
+    inicio = max(inicio, menor) if inicio else menor
+    fim = min(fim, maior) if fim else maior
+
+    hoje = datetime.utcnow().date()
+    fechados, pontas, ordem = [], [], []
+    dia = inicio
+    while dia <= fim:
+        fim_mes = _fim_do_mes(dia)
+        mes = dia.strftime('%Y-%m')
+        if dia.day == 1 and fim_mes <= fim and fim_mes < hoje:
+            fechados.append(mes)
+        else:
+            pontas.append((dia, min(fim_mes, fim)))
+        ordem.append(mes)
+        dia = fim_mes + timedelta(days=1)
+
+    meses = _meses_fechados(fechados)
+    if pontas:
+        meses.update(_agregar(pontas))
+    return Relatorio([(mes, meses.get(mes, _VAZIO)) for mes in ordem])
+
+def vendas_mensais(inicio=None, fim=None):
+    return calcular(inicio, fim).vendas_mensais()
+
+def produtos_mais_vendidos(inicio=None, fim=None, limit=5):
+    return calcular(inicio, fim).produtos_mais_vendidos(limit)
+
+def clientes_top(inicio=None, fim=None, limit=5):
+    return calcular(inicio, fim).clientes_top(limit)
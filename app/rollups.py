@@ -0,0 +1,101 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.sql import func
+from datetime import datetime, timedelta
+from . import db, reports
+from .models import Sale, SaleDaily, SaleDailyProduct, SaleDailyClient
+
+# ---------- MANUTENÇÃO INCREMENTAL ----------
+def _upsert(model, chaves, linhas):
+    """Soma as linhas nos resumos com um único INSERT ... ON CONFLICT (executemany)."""
+    if not linhas:
+        return
+    stmt = sqlite_insert(model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(chaves),
+        set_={
+            'quantidade': model.quantidade + stmt.excluded.quantidade,
+            'total': model.total + stmt.excluded.total,
+            'vendas': model.vendas + stmt.excluded.vendas,
+        }
+    )
+    db.session.execute(stmt, linhas)
+
+def _agrupar(vendas, chaves, sinal):
+    grupos = {}
+    for v in vendas:
+        dados = {'dia': v['created_at'].date(), 'produto_id': v['produto_id'], 'cliente_id': v['cliente_id']}
+        chave = tuple(dados[c] for c in chaves)
+        grupo = grupos.setdefault(chave, {**{c: dados[c] for c in chaves}, 'quantidade': 0, 'total': 0, 'vendas': 0})
+        grupo['quantidade'] += sinal * v['quantidade']
+        grupo['total'] += sinal * v['total']
+        grupo['vendas'] += sinal
+    return list(grupos.values())
+
+def _acumular(vendas, sinal):
+    _upsert(SaleDaily, ('dia',), _agrupar(vendas, ('dia',), sinal))
+    _upsert(SaleDailyProduct, ('dia', 'produto_id'), _agrupar(vendas, ('dia', 'produto_id'), sinal))
+    _upsert(SaleDailyClient, ('dia', 'cliente_id'), _agrupar(vendas, ('dia', 'cliente_id'), sinal))
+
+def _como_dict(venda):
+    return {
+        'created_at': venda.created_at,
+        'produto_id': venda.produto_id,
+        'cliente_id': venda.cliente_id,
+        'quantidade': venda.quantidade,
+        'total': venda.total,
+    }
+
+def registrar_venda(venda):
+    """Soma a venda aos resumos. Chamar após o flush (created_at preenchido) e antes do commit."""
+    _acumular([_como_dict(venda)], 1)
+
+def registrar_vendas(linhas):
+    """Versão em lote: linhas são dicts com created_at, produto_id, cliente_id, quantidade e total."""
+    _acumular(linhas, 1)
+
+def estornar_venda(venda):
+    """Remove a venda dos resumos, na mesma transação da exclusão."""
+    _acumular([_como_dict(venda)], -1)
+
+# ---------- RECONSTRUÇÃO (BACKFILL) ----------
+def rebuild(start=None, end=None):
+    """Recalcula os resumos a partir de Sale, opcionalmente só para [start, end] (datas)."""
+    dia = func.date(Sale.created_at)
+    filtros = []
+    if start:
+        filtros.append(Sale.created_at >= datetime.combine(start, datetime.min.time()))
+    if end:
+        filtros.append(Sale.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+
+    for model, chave in ((SaleDaily, None), (SaleDailyProduct, Sale.produto_id), (SaleDailyClient, Sale.cliente_id)):
+        limpar = model.query
+        if start:
+            limpar = limpar.filter(model.dia >= start)
+        if end:
+            limpar = limpar.filter(model.dia <= end)
+        limpar.delete(synchronize_session=False)
+
+        colunas = [dia] + ([chave] if chave is not None else [])
+        origem = select(
+            *colunas,
+            func.sum(Sale.quantidade),
+            func.sum(Sale.total),
+            func.count(Sale.id)
+        ).where(*filtros).group_by(*colunas)
+        destino = ['dia'] + ([chave.key] if chave is not None else []) + ['quantidade', 'total', 'vendas']
+        db.session.execute(insert(model).from_select(destino, origem))
+    # Os meses guardados pelos relatórios vieram dos resumos antigos
+    reports.invalidar_tudo()
+    db.session.commit()
+
+@click.command('rebuild-rollups')
+@click.option('--start', type=click.DateTime(formats=['%Y-%m-%d']), help='Data inicial (AAAA-MM-DD).')
+@click.option('--end', type=click.DateTime(formats=['%Y-%m-%d']), help='Data final (AAAA-MM-DD).')
+@with_appcontext
+def rebuild_command(start, end):
+    """Reconstrói as tabelas de resumo de vendas."""
+    rebuild(start.date() if start else None, end.date() if end else None)
+    click.echo('Resumos de vendas reconstruídos.')
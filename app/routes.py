@@ -1,32 +1,62 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+import io
+import json
+import os
+from functools import partial
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, abort, Response, stream_with_context, send_file
 from flask_login import login_user, login_required, logout_user, current_user
 from . import db
-from .models import User, Client, Product, Sale, Supplier
+from .models import User, Client, Product, Sale, Supplier, SaleDaily, Job
 from sqlalchemy.sql import func
-from sqlalchemy import desc
-from datetime import datetime
+from sqlalchemy.orm import joinedload
+from datetime import datetime, timedelta
 from .forms import ClientForm, ProductForm, ChangePasswordForm, ChangeEmailForm, DeleteAccountForm, SupplierForm
 from flask_wtf import FlaskForm
+from .pagination import keyset_page
+from . import auth, reports, search, export, importer, jobs, estoque, previsao
+from .sales import efetuar_pedido, estornar_venda, EstoqueInsuficiente, ProdutoNaoEncontrado, MAX_ITENS_PEDIDO
+from .cache import metrics_cache, CLIENTES_KEYS, PRODUTOS_KEYS, FORNECEDORES_KEYS, VENDAS_KEYS, USERS_KEYS
 
 main = Blueprint('main', __name__)
 
+SALES_PER_PAGE = 50
+SEARCH_PER_PAGE = 25
+TYPEAHEAD_LIMIT = 10
+
 # ---------- PÁGINAS GERAIS E DASHBOARD ----------
 @main.route('/')
 def index():
     return redirect(url_for('main.dashboard'))
 
+def _ultimas_vendas():
+    # Nomes de cliente e produto no mesmo SELECT (sem N+1 no template)
+    return Sale.query.with_entities(
+        Client.nome.label('cliente_nome'),
+        Product.nome.label('produto_nome'),
+        Sale.quantidade,
+        Sale.total
+    ).join(Client, Client.id == Sale.cliente_id).join(Product, Product.id == Sale.produto_id).order_by(
+        Sale.created_at.desc(), Sale.id.desc()
+    ).limit(5).all()
+
 @main.route('/dashboard')
 @login_required
 def dashboard():
-    clientes_count = Client.query.count()
-    users_count = User.query.count()
-    produtos_count = Product.query.count()
-    fornecedores_count = Supplier.query.count()
-    
-    vendas_total = db.session.query(func.sum(Sale.total)).scalar() or 0
-    ultimos_clientes = Client.query.order_by(Client.created_at.desc()).limit(5).all()
-    ultimos_produtos = Product.query.order_by(Product.created_at.desc()).limit(5).all()
-    ultimas_vendas = Sale.query.order_by(Sale.created_at.desc()).limit(5).all()
+    # Cada métrica é cacheada separadamente e invalidada pelas rotas de escrita
+    get = metrics_cache.get_or_set
+    clientes_count = get('clientes_count', lambda: Client.query.count())
+    users_count = get('users_count', lambda: User.query.count())
+    produtos_count = get('produtos_count', lambda: Product.query.count())
+    fornecedores_count = get('fornecedores_count', lambda: Supplier.query.count())
+
+    vendas_total = get('vendas_total', lambda: db.session.query(func.sum(SaleDaily.total)).scalar() or 0)
+    ultimos_clientes = get('ultimos_clientes', lambda: Client.query.with_entities(
+        Client.nome, Client.email
+    ).order_by(Client.created_at.desc()).limit(5).all())
+    ultimos_produtos = get('ultimos_produtos', lambda: Product.query.with_entities(
+        Product.nome, Product.preco
+    ).order_by(Product.created_at.desc()).limit(5).all())
+    ultimas_vendas = get('ultimas_vendas', _ultimas_vendas)
+    estoque_baixo = get('estoque_baixo', estoque.resumo)
     
     return render_template('dashboard.html', 
                             clientes_count=clientes_count, 
@@ -36,21 +66,40 @@ def dashboard():
                             ultimos_clientes=ultimos_clientes,
                             ultimos_produtos=ultimos_produtos,
                             ultimas_vendas=ultimas_vendas,
+                            estoque_baixo=estoque_baixo,
                             fornecedores_count=fornecedores_count)
 
+@main.route('/dashboard/cache')
+@login_required
+def dashboard_cache():
+    return jsonify(metrics_cache.stats())
+
+# ---------- BUSCA (TYPEAHEAD) ----------
+@main.route('/busca')
+@login_required
+def busca():
+    termo = request.args.get('q', '')
+    tipo = request.args.get('tipo')
+    tipos = [tipo] if tipo in search.INDICES else list(search.INDICES)
+    resultados = []
+    for t in tipos:
+        itens, _ = search.search(t, termo, per_page=TYPEAHEAD_LIMIT)
+        resultados.extend({'tipo': t, 'id': item.id, 'nome': item.nome} for item in itens)
+    return jsonify(resultados)
+
 # ---------- CLIENTES CRUD (AJUSTADO PARA PESQUISA) ----------
 @main.route('/clientes')
 @login_required
 def clientes():
     search_query = request.args.get('search_query')
+    page = request.args.get('page', 1, type=int)
+    has_next = False
     if search_query:
-        all_clients = Client.query.filter(
-            Client.nome.ilike(f'%{search_query}%') | 
-            Client.email.ilike(f'%{search_query}%')
-        ).order_by(Client.nome).all()
+        all_clients, has_next = search.search('clientes', search_query, page=max(page, 1), per_page=SEARCH_PER_PAGE)
     else:
-        all_clients = Client.query.order_by(Client.nome).all()
-    return render_template('clientes.html', clientes=all_clients, search_query=search_query)
+        # Consulta ainda não executada: só roda se o fragmento não estiver em cache
+        all_clients = Client.query.order_by(Client.nome)
+    return render_template('clientes.html', clientes=all_clients, search_query=search_query, page=page, has_next=has_next)
 
 @main.route('/clientes/novo', methods=['GET', 'POST'])
 @login_required
@@ -65,6 +114,7 @@ def novo_cliente():
         )
         db.session.add(c)
         db.session.commit()
+        metrics_cache.invalidate(*CLIENTES_KEYS)
         flash('Cliente criado com sucesso', 'success')
         return redirect(url_for('main.clientes'))
     return render_template('client_form.html', form=form, client=None)
@@ -77,6 +127,7 @@ def editar_cliente(cid):
     if form.validate_on_submit():
         form.populate_obj(client)
         db.session.commit()
+        metrics_cache.invalidate(*CLIENTES_KEYS)
         flash('Cliente atualizado', 'success')
         return redirect(url_for('main.clientes'))
     return render_template('client_form.html', form=form, client=client)
@@ -87,6 +138,7 @@ def deletar_cliente(cid):
     client = Client.query.get_or_404(cid)
     db.session.delete(client)
     db.session.commit()
+    metrics_cache.invalidate(*CLIENTES_KEYS)
     flash('Cliente removido', 'success')
     return redirect(url_for('main.clientes'))
 
@@ -95,11 +147,13 @@ def deletar_cliente(cid):
 @login_required
 def produtos():
     search_query = request.args.get('search_query')
+    page = request.args.get('page', 1, type=int)
+    has_next = False
     if search_query:
-        all_products = Product.query.filter(Product.nome.ilike(f'%{search_query}%')).order_by(Product.nome).all()
+        all_products, has_next = search.search('produtos', search_query, page=max(page, 1), per_page=SEARCH_PER_PAGE)
     else:
-        all_products = Product.query.order_by(Product.nome).all()
-    return render_template('products.html', produtos=all_products, search_query=search_query)
+        all_products = Product.query.order_by(Product.nome)
+    return render_template('products.html', produtos=all_products, search_query=search_query, page=page, has_next=has_next)
 
 @main.route('/produtos/novo', methods=['GET', 'POST'])
 @login_required
@@ -113,10 +167,15 @@ def novo_produto():
             preco=form.preco.data, 
             descricao=form.descricao.data, 
             fornecedor_id=form.fornecedor.data,
-            estoque=form.estoque.data
+            estoque=form.estoque.data,
+            estoque_minimo=form.estoque_minimo.data or 0
         )
         db.session.add(p)
+        db.session.flush()
+        if p.estoque:
+            estoque.registrar([estoque.movimento(p.id, estoque.AJUSTE, p.estoque, observacao='cadastro')])
         db.session.commit()
+        metrics_cache.invalidate(*PRODUTOS_KEYS)
         flash('Produto criado com sucesso', 'success')
         return redirect(url_for('main.produtos'))
     
@@ -133,20 +192,42 @@ def editar_produto(pid):
         produto.nome = form.nome.data
         produto.preco = form.preco.data
         produto.descricao = form.descricao.data
-        produto.estoque = form.estoque.data
+        try:
+            estoque.definir(produto.id, form.estoque.data, observacao='edição do produto')
+        except estoque.EstoqueAlterado:
+            db.session.rollback()
+            flash('O estoque deste produto mudou enquanto você editava. Recarregue e tente novamente.', 'danger')
+            return redirect(url_for('main.editar_produto', pid=pid))
+        produto.estoque_minimo = form.estoque_minimo.data or 0
         produto.fornecedor_id = form.fornecedor.data
         db.session.commit()
+        metrics_cache.invalidate(*PRODUTOS_KEYS)
         flash('Produto atualizado', 'success')
         return redirect(url_for('main.produtos'))
     
     return render_template('product_form.html', form=form, produto=produto)
 
+@main.route('/produtos/estoque-baixo')
+@login_required
+def estoque_baixo():
+    fornecedor_id = request.args.get('fornecedor_id', type=int)
+    grupos = estoque.por_fornecedor(estoque.produtos_a_repor(fornecedor_id))
+    return render_template('estoque_baixo.html', grupos=grupos)
+
+@main.route('/produtos/previsao')
+@login_required
+def previsao_reposicao():
+    fornecedor_id = request.args.get('fornecedor_id', type=int)
+    grupos = estoque.por_fornecedor(previsao.sugestoes(fornecedor_id))
+    return render_template('previsao.html', grupos=grupos, parametros=previsao.parametros())
+
 @main.route('/produtos/deletar/<int:pid>', methods=['POST'])
 @login_required
 def deletar_produto(pid):
     produto = Product.query.get_or_404(pid)
     db.session.delete(produto)
     db.session.commit()
+    metrics_cache.invalidate(*PRODUTOS_KEYS)
     flash('Produto removido', 'success')
     return redirect(url_for('main.produtos'))
 
@@ -154,8 +235,43 @@ def deletar_produto(pid):
 @main.route('/vendas')
 @login_required
 def vendas():
-    all_sales = Sale.query.order_by(Sale.created_at.desc()).all()
-    return render_template('sales.html', vendas=all_sales)
+    cursor = request.args.get('cursor')
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    cliente_id = request.args.get('cliente_id', type=int)
+    produto_id = request.args.get('produto_id', type=int)
+
+    # Cliente e produto vêm no mesmo SELECT (sem N+1 no template)
+    query = Sale.query.options(
+        joinedload(Sale.cliente).load_only(Client.nome),
+        joinedload(Sale.produto).load_only(Product.nome)
+    )
+    if cliente_id:
+        query = query.filter(Sale.cliente_id == cliente_id)
+    if produto_id:
+        query = query.filter(Sale.produto_id == produto_id)
+    try:
+        if start_date:
+            query = query.filter(Sale.created_at >= datetime.strptime(start_date, '%Y-%m-%d'))
+        if end_date:
+            query = query.filter(Sale.created_at < datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1))
+    except ValueError:
+        flash('Data inválida', 'warning')
+        return redirect(url_for('main.vendas'))
+
+    # A página e as listas dos filtros só são lidas se o fragmento não estiver em cache
+    pagina = partial(keyset_page, query, Sale.created_at, Sale.id, cursor=cursor, per_page=SALES_PER_PAGE)
+
+    filtros = {
+        'start_date': start_date,
+        'end_date': end_date,
+        'cliente_id': cliente_id,
+        'produto_id': produto_id,
+    }
+    clientes = Client.query.with_entities(Client.id, Client.nome).order_by(Client.nome)
+    produtos = Product.query.with_entities(Product.id, Product.nome).order_by(Product.nome)
+    return render_template('sales.html', pagina=pagina, cursor=cursor,
+                           filtros=filtros, clientes=clientes, produtos=produtos)
 
 @main.route('/vendas/nova', methods=['GET', 'POST'])
 @login_required
@@ -164,55 +280,55 @@ def nova_venda():
         pass
         
     form = SaleForm()
-    clientes = Client.query.order_by(Client.nome).all()
-    produtos = Product.query.order_by(Product.nome).filter(Product.estoque > 0).all()
     
     if request.method == 'POST':
-        cliente_id = request.form.get('cliente_id')
-        produto_id = request.form.get('produto_id')
-        quantidade = request.form.get('quantidade')
+        cliente_id = request.form.get('cliente_id', type=int)
+        produto_ids = request.form.getlist('produto_id')
+        quantidades = request.form.getlist('quantidade')
 
-        if not cliente_id or not produto_id or not quantidade:
+        # Linhas totalmente vazias (item adicionado e não preenchido) são ignoradas
+        linhas = [(p, q) for p, q in zip(produto_ids, quantidades) if p or q]
+        if not cliente_id or not linhas or not all(p and q for p, q in linhas):
             flash('Todos os campos são obrigatórios', 'warning')
             return redirect(url_for('main.nova_venda'))
+        if len(linhas) > MAX_ITENS_PEDIDO:
+            flash(f'O pedido pode ter no máximo {MAX_ITENS_PEDIDO} itens', 'warning')
+            return redirect(url_for('main.nova_venda'))
 
         try:
-            quantidade = int(quantidade)
-            if quantidade <= 0:
-                flash('A quantidade deve ser maior que zero', 'danger')
-                return redirect(url_for('main.nova_venda'))
+            itens = [(int(p), int(q)) for p, q in linhas]
         except ValueError:
             flash('A quantidade deve ser um número válido', 'danger')
             return redirect(url_for('main.nova_venda'))
+        if any(q <= 0 for _, q in itens):
+            flash('A quantidade deve ser maior que zero', 'danger')
+            return redirect(url_for('main.nova_venda'))
 
-        produto = Product.query.get(produto_id)
-        if not produto:
+        try:
+            efetuar_pedido(cliente_id, itens)
+        except ProdutoNaoEncontrado:
             flash('Produto não encontrado', 'danger')
             return redirect(url_for('main.nova_venda'))
-        
-        if produto.estoque < quantidade:
-            flash(f'Estoque insuficiente. Disponível: {produto.estoque}', 'danger')
+        except EstoqueInsuficiente as e:
+            flash(str(e), 'danger')
             return redirect(url_for('main.nova_venda'))
-        
-        produto.estoque -= quantidade
 
-        total = produto.preco * quantidade
-        
-        venda = Sale(cliente_id=cliente_id, produto_id=produto_id, quantidade=quantidade, total=total)
-        db.session.add(venda)
-        db.session.commit()
+        metrics_cache.invalidate(*VENDAS_KEYS)
         flash('Venda registrada com sucesso', 'success')
         return redirect(url_for('main.vendas'))
+
+    clientes = Client.query.order_by(Client.nome).all()
+    produtos = Product.query.order_by(Product.nome).filter(Product.estoque > 0).all()
         
     return render_template('sale_form.html', clientes=clientes, produtos=produtos, form=form)
 
 @main.route('/vendas/deletar/<int:sid>', methods=['POST'])
 @login_required
 def deletar_venda(sid):
-    venda = Sale.query.get_or_404(sid)
-    db.session.delete(venda)
-    db.session.commit()
-    flash('Venda removida', 'success')
+    Sale.query.get_or_404(sid)
+    estornar_venda(sid)
+    metrics_cache.invalidate(*VENDAS_KEYS)
+    flash('Venda removida e quantidade devolvida ao estoque', 'success')
     return redirect(url_for('main.vendas'))
 
 # ---------- FORNECEDORES CRUD (AJUSTADO PARA PESQUISA) ----------
@@ -220,11 +336,13 @@ def deletar_venda(sid):
 @login_required
 def fornecedores():
     search_query = request.args.get('search_query')
+    page = request.args.get('page', 1, type=int)
+    has_next = False
     if search_query:
-        all_suppliers = Supplier.query.filter(Supplier.nome.ilike(f'%{search_query}%')).order_by(Supplier.nome).all()
+        all_suppliers, has_next = search.search('fornecedores', search_query, page=max(page, 1), per_page=SEARCH_PER_PAGE)
     else:
-        all_suppliers = Supplier.query.order_by(Supplier.nome).all()
-    return render_template('suppliers.html', fornecedores=all_suppliers, search_query=search_query)
+        all_suppliers = Supplier.query.order_by(Supplier.nome)
+    return render_template('suppliers.html', fornecedores=all_suppliers, search_query=search_query, page=page, has_next=has_next)
 
 @main.route('/fornecedores/novo', methods=['GET', 'POST'])
 @login_required
@@ -239,6 +357,7 @@ def novo_fornecedor():
         )
         db.session.add(s)
         db.session.commit()
+        metrics_cache.invalidate(*FORNECEDORES_KEYS)
         flash('Fornecedor criado com sucesso', 'success')
         return redirect(url_for('main.fornecedores'))
     
@@ -267,37 +386,36 @@ def deletar_fornecedor(sid):
         return redirect(url_for('main.fornecedores'))
     db.session.delete(fornecedor)
     db.session.commit()
+    metrics_cache.invalidate(*FORNECEDORES_KEYS)
     flash('Fornecedor removido', 'success')
     return redirect(url_for('main.fornecedores'))
 
 # ---------- RELATÓRIOS E CONFIGURAÇÕES (AJUSTADO PARA FILTRO DE DATA) ----------
+def _periodo_da_requisicao():
+    """Lê start_date/end_date (AAAA-MM-DD) da query string; ValueError se inválidas."""
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    inicio = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+    fim = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+    return inicio, fim
+
 @main.route('/relatorios')
 @login_required
 def relatorios():
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
 
-    query_base = Sale.query
-
-    if start_date:
-        query_base = query_base.filter(Sale.created_at >= datetime.strptime(start_date, '%Y-%m-%d'))
-    if end_date:
-        query_base = query_base.filter(Sale.created_at <= datetime.strptime(end_date, '%Y-%m-%d'))
-    
-    vendas_mensais = query_base.with_entities(
-        func.strftime('%Y-%m', Sale.created_at).label('mes'),
-        func.sum(Sale.total).label('total_mes')
-    ).group_by('mes').order_by('mes').all()
-
-    produtos_mais_vendidos = query_base.with_entities(
-        Product.nome,
-        func.sum(Sale.quantidade).label('total_quantidade')
-    ).join(Product).group_by(Product.nome).order_by(desc('total_quantidade')).limit(5).all()
+    try:
+        inicio, fim = _periodo_da_requisicao()
+    except ValueError:
+        flash('Data inválida', 'warning')
+        return redirect(url_for('main.relatorios'))
 
-    clientes_top = query_base.with_entities(
-        Client.nome,
-        func.sum(Sale.total).label('total_gasto')
-    ).join(Client).group_by(Client.nome).order_by(desc('total_gasto')).limit(5).all()
+    # Meses encerrados vêm do cache; só as pontas do período são somadas agora
+    relatorio = reports.calcular(inicio, fim)
+    vendas_mensais = relatorio.vendas_mensais()
+    produtos_mais_vendidos = relatorio.produtos_mais_vendidos()
+    clientes_top = relatorio.clientes_top()
 
     return render_template('relatorios.html', 
                             vendas_mensais=vendas_mensais,
@@ -306,6 +424,123 @@ def relatorios():
                             start_date=start_date,
                             end_date=end_date)
 
+# ---------- EXPORTAÇÃO ----------
+@main.route('/exportar/<recurso>.<formato>')
+@login_required
+def exportar(recurso, formato):
+    if recurso not in export.EXPORTACOES or formato not in export.MIMETYPES:
+        abort(404)
+    try:
+        inicio, fim = _periodo_da_requisicao()
+    except ValueError:
+        flash('Data inválida', 'warning')
+        return redirect(url_for('main.relatorios'))
+
+    linhas = export.EXPORTACOES[recurso](inicio, fim)
+    if formato == 'csv':
+        corpo = export.gerar_csv(linhas)
+    else:
+        corpo = export.gerar_xlsx(linhas, recurso)
+    return Response(
+        stream_with_context(corpo),
+        mimetype=export.MIMETYPES[formato],
+        headers={'Content-Disposition': f'attachment; filename={recurso}.{formato}'}
+    )
+
+# ---------- IMPORTAÇÃO ----------
+@main.route('/importar', methods=['GET', 'POST'])
+@login_required
+def importar():
+    class ImportForm(FlaskForm):
+        pass
+
+    form = ImportForm()
+    resultado = None
+    if form.validate_on_submit():
+        tipo = request.form.get('tipo')
+        arquivo = request.files.get('arquivo')
+        if tipo not in importer.IMPORTACOES or not arquivo or not arquivo.filename:
+            flash('Selecione o tipo e o arquivo CSV', 'warning')
+            return redirect(url_for('main.importar'))
+        if request.form.get('segundo_plano'):
+            job = jobs.enfileirar('importar', {'tipo': tipo, 'arquivo': jobs.salvar_upload(arquivo)}, current_user.id)
+            flash(f'Importação enviada para processamento (tarefa #{job.id})', 'info')
+            return redirect(url_for('main.tarefas'))
+        texto = io.TextIOWrapper(arquivo.stream, encoding='utf-8-sig', newline='')
+        try:
+            resultado = importer.importar(tipo, texto)
+        except UnicodeDecodeError:
+            db.session.rollback()
+            flash('O arquivo deve estar em UTF-8', 'danger')
+            return redirect(url_for('main.importar'))
+        flash(f"{resultado['inseridos']} registros importados", 'success' if not resultado['total_erros'] else 'warning')
+    return render_template('importar.html', form=form, resultado=resultado, tipos=list(importer.IMPORTACOES),
+                           campos={t: c['campos'] for t, c in importer.IMPORTACOES.items()})
+
+# ---------- TAREFAS EM SEGUNDO PLANO ----------
+TAREFAS_POR_PAGINA = 50
+
+def _tarefa_do_usuario(job_id):
+    job = db.session.get(Job, job_id)
+    if job is None or job.usuario_id != current_user.id:
+        abort(404)
+    return job
+
+def _status_tarefa(job):
+    return {
+        'id': job.id,
+        'tipo': job.tipo,
+        'status': job.status,
+        'processados': job.processados,
+        'total': job.total,
+        'progresso': round(100 * job.processados / job.total, 1) if job.total else None,
+        'erro': job.erro,
+        'resultado': json.loads(job.resultado) if job.resultado else None,
+        'download_url': url_for('main.baixar_tarefa', job_id=job.id) if job.arquivo else None,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'concluido_em': job.concluido_em.isoformat() if job.concluido_em else None,
+    }
+
+@main.route('/tarefas')
+@login_required
+def tarefas():
+    lista = Job.query.filter_by(usuario_id=current_user.id).order_by(Job.id.desc()).limit(TAREFAS_POR_PAGINA).all()
+    return render_template('tarefas.html', tarefas=lista, finalizados=jobs.FINALIZADOS)
+
+@main.route('/tarefas/exportar/<recurso>.<formato>', methods=['POST'])
+@login_required
+def exportar_em_segundo_plano(recurso, formato):
+    if recurso not in export.EXPORTACOES or formato not in export.MIMETYPES:
+        abort(404)
+    try:
+        inicio, fim = _periodo_da_requisicao()
+    except ValueError:
+        flash('Data inválida', 'warning')
+        return redirect(url_for('main.relatorios'))
+    parametros = {
+        'recurso': recurso,
+        'formato': formato,
+        'inicio': inicio.isoformat() if inicio else None,
+        'fim': fim.isoformat() if fim else None,
+    }
+    job = jobs.enfileirar('exportar', parametros, current_user.id)
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(_status_tarefa(job)), 202, {'Location': url_for('main.status_tarefa', job_id=job.id)}
+    flash(f'Exportação enviada para processamento (tarefa #{job.id})', 'info')
+    return redirect(url_for('main.tarefas'))
+
+@main.route('/tarefas/<int:job_id>')
+@login_required
+def status_tarefa(job_id):
+    return jsonify(_status_tarefa(_tarefa_do_usuario(job_id)))
+
+@main.route('/tarefas/<int:job_id>/download')
+@login_required
+def baixar_tarefa(job_id):
+    job = _tarefa_do_usuario(job_id)
+    if job.status != jobs.CONCLUIDO or not job.arquivo or not os.path.exists(job.arquivo):
+        abort(404)
+    return send_file(job.arquivo, mimetype=job.mimetype, as_attachment=True, download_name=job.nome_arquivo)
 
 @main.route('/configuracoes', methods=['GET', 'POST'])
 @login_required
@@ -318,6 +553,7 @@ def configuracoes():
     if password_form.validate_on_submit() and password_form.submit.data:
         user.set_password(password_form.nova_senha.data)
         db.session.commit()
+        auth.invalidar_usuario(user.id)
         flash('Sua senha foi atualizada com sucesso!', 'success')
         return redirect(url_for('main.configuracoes'))
 
@@ -327,6 +563,7 @@ def configuracoes():
         else:
             user.email = email_form.email.data
             db.session.commit()
+            auth.invalidar_usuario(user.id)
             flash('Seu e-mail foi atualizado com sucesso!', 'success')
         return redirect(url_for('main.configuracoes'))
 
@@ -336,6 +573,8 @@ def configuracoes():
         else:
             db.session.delete(user)
             db.session.commit()
+            auth.invalidar_usuario(user.id)
+            metrics_cache.invalidate(*USERS_KEYS)
             flash('Sua conta foi deletada com sucesso.', 'info')
             return redirect(url_for('main.login'))
             
@@ -359,6 +598,8 @@ def delete_user(uid):
     user_to_delete = User.query.get_or_404(uid)
     db.session.delete(user_to_delete)
     db.session.commit()
+    auth.invalidar_usuario(uid)
+    metrics_cache.invalidate(*USERS_KEYS)
     flash('Usuário removido com sucesso.', 'success')
     return redirect(url_for('main.users'))
 
@@ -374,8 +615,16 @@ def login():
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
+        # O limite é verificado antes do hash, que é a parte cara do login
+        espera = auth.tentativa_de_login(request.remote_addr, username)
+        if espera:
+            flash(f'Muitas tentativas de login. Tente novamente em {espera} s.', 'danger')
+            return render_template('login.html', form=form), 429, {'Retry-After': str(espera)}
         user = User.query.filter_by(username=username).first()
         if user and user.check_password(password):
+            if auth.precisa_rehash(user.password_hash):
+                user.set_password(password)
+                db.session.commit()
             login_user(user)
             flash('Logado com sucesso', 'success')
             return redirect(url_for('main.dashboard'))
@@ -404,6 +653,9 @@ def register():
         u.set_password(password)
         db.session.add(u)
         db.session.commit()
+        # O SQLite pode reaproveitar o id de um usuário excluído
+        auth.invalidar_usuario(u.id)
+        metrics_cache.invalidate(*USERS_KEYS)
         flash('Cadastro concluído. Faça login!', 'success')
         return redirect(url_for('main.login'))
     return render_template('register.html', form=form)
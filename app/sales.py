@@ -0,0 +1,126 @@
+import random
+import time
+from datetime import datetime
+from functools import wraps
+from sqlalchemy import case, func, insert, update
+from sqlalchemy.exc import OperationalError
+from . import db, estoque, rollups
+from .models import Product, Sale, SaleOrder
+
+MAX_ITENS_PEDIDO = 500
+
+# ---------- REGISTRO DE VENDAS ----------
+class ProdutoNaoEncontrado(Exception):
+    pass
+
+class EstoqueInsuficiente(Exception):
+    def __init__(self, disponivel, produto=None):
+        if produto:
+            super().__init__(f'Estoque insuficiente para {produto}. Disponível: {disponivel}')
+        else:
+            super().__init__(f'Estoque insuficiente. Disponível: {disponivel}')
+        self.disponivel = disponivel
+        self.produto = produto
+
+def com_retry(func, tentativas=5, espera=0.02):
+    """Repete a transação inteira quando o SQLite responde 'database is locked'."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        for tentativa in range(tentativas):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                db.session.rollback()
+                if 'database is locked' not in str(e.orig) or tentativa == tentativas - 1:
+                    raise
+                # Backoff exponencial com jitter para os workers não colidirem de novo
+                time.sleep(espera * (2 ** tentativa) * (0.5 + random.random()))
+    return wrapper
+
+@com_retry
+def estornar_venda(venda_id):
+    """Remove a venda e devolve a quantidade ao estoque, em uma única transação.
+
+    Retorna a venda removida (None se ela já não existir).
+    """
+    venda = db.session.get(Sale, venda_id)
+    if venda is None:
+        return None
+    db.session.execute(
+        update(Product).where(Product.id == venda.produto_id)
+        .values(estoque=func.coalesce(Product.estoque, 0) + venda.quantidade),
+        execution_options={'synchronize_session': False}
+    )
+    estoque.registrar([estoque.movimento(venda.produto_id, estoque.ESTORNO, venda.quantidade, venda_id=venda.id)])
+    rollups.estornar_venda(venda)
+    if venda.pedido_id:
+        SaleOrder.query.filter_by(id=venda.pedido_id).update({'total': SaleOrder.total - venda.total})
+    # O gatilho sale_relatorio_ad invalida o mês da venda nos relatórios
+    db.session.delete(venda)
+    db.session.commit()
+    return venda
+
+# ---------- PEDIDOS COM VÁRIOS ITENS ----------
+def _consolidar(itens):
+    """Soma linhas repetidas do mesmo produto, mantendo a ordem do formulário."""
+    quantidades = {}
+    for produto_id, quantidade in itens:
+        quantidades[produto_id] = quantidades.get(produto_id, 0) + quantidade
+    return quantidades
+
+def baixar_estoque_em_lote(quantidades):
+    """Decrementa o estoque de todos os produtos com um único UPDATE ... CASE.
+
+    Retorna {produto_id: preco}. Se algum produto não existir ou não tiver
+    estoque suficiente, nada é alterado e a exceção correspondente é lançada.
+    """
+    por_produto = case(quantidades, value=Product.id)
+    stmt = update(Product).where(
+        Product.id.in_(list(quantidades)),
+        Product.estoque >= por_produto
+    ).values(estoque=Product.estoque - por_produto).returning(Product.id, Product.preco)
+    precos = dict(db.session.execute(stmt, execution_options={'synchronize_session': False}).all())
+    if len(precos) == len(quantidades):
+        return precos
+
+    db.session.rollback()
+    atuais = {p.id: p for p in Product.query.with_entities(Product.id, Product.nome, Product.estoque)
+              .filter(Product.id.in_(list(quantidades))).all()}
+    for produto_id in quantidades:
+        if produto_id not in atuais:
+            raise ProdutoNaoEncontrado()
+    produto_id = next((pid for pid, q in quantidades.items() if (atuais[pid].estoque or 0) < q), next(iter(quantidades)))
+    raise EstoqueInsuficiente(atuais[produto_id].estoque or 0, atuais[produto_id].nome)
+
+@com_retry
+def efetuar_pedido(cliente_id, itens):
+    """Registra um pedido com vários itens [(produto_id, quantidade), ...] em uma transação."""
+    quantidades = _consolidar(itens)
+    precos = baixar_estoque_em_lote(quantidades)
+
+    agora = datetime.utcnow()
+    linhas = [
+        {'cliente_id': cliente_id, 'produto_id': produto_id, 'quantidade': quantidade,
+         'total': precos[produto_id] * quantidade, 'created_at': agora}
+        for produto_id, quantidade in quantidades.items()
+    ]
+    pedido = SaleOrder(cliente_id=cliente_id, total=sum(l['total'] for l in linhas), created_at=agora)
+    db.session.add(pedido)
+    db.session.flush()
+    for linha in linhas:
+        linha['pedido_id'] = pedido.id
+
+    # Todas as linhas em um único executemany. Sem RETURNING: no SQLite o
+    # SQLAlchemy só garante a ordem dos ids enviando um INSERT por linha.
+    # Depois de _consolidar cada produto aparece uma vez no pedido, então
+    # (pedido_id, produto_id) identifica a venda.
+    db.session.execute(insert(Sale), linhas)
+    ids = dict(db.session.query(Sale.produto_id, Sale.id).filter(Sale.pedido_id == pedido.id).all())
+    rollups.registrar_vendas(linhas)
+    estoque.registrar([
+        estoque.movimento(linha['produto_id'], estoque.VENDA, -linha['quantidade'],
+                          venda_id=ids[linha['produto_id']], created_at=agora)
+        for linha in linhas
+    ])
+    db.session.commit()
+    return pedido
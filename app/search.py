@@ -0,0 +1,81 @@
+import re
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import or_, text
+from . import db
+from .models import Client, Product, Supplier
+
+# ---------- BUSCA TEXTUAL (SQLite FTS5) ----------
+# Cada tabela tem uma tabela virtual FTS5 de "conteúdo externo" que só guarda
+# o índice invertido; gatilhos no próprio SQLite a mantêm sincronizada em
+# qualquer INSERT/UPDATE/DELETE, inclusive fora do ORM. O tokenizador
+# unicode61 com remove_diacritics faz "joao" encontrar "João". Tabelas e
+# gatilhos são criados pelas migrações; sem FTS5 a busca usa ILIKE.
+
+INDICES = {
+    'clientes': {'model': Client, 'tabela': 'client', 'colunas': ('nome', 'email'), 'pesos': (10.0, 1.0)},
+    'produtos': {'model': Product, 'tabela': 'product', 'colunas': ('nome', 'descricao'), 'pesos': (10.0, 1.0)},
+    'fornecedores': {'model': Supplier, 'tabela': 'supplier', 'colunas': ('nome', 'email'), 'pesos': (10.0, 1.0)},
+}
+
+def _existe(conn, tabela):
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': tabela}
+    ).first() is not None
+
+def disponivel():
+    """True se as tabelas FTS existem; consultado uma vez por processo, na primeira busca."""
+    fts = current_app.extensions.get('search_fts')
+    if fts is None:
+        fts = all(_existe(db.session, f"{indice['tabela']}_fts") for indice in INDICES.values())
+        current_app.extensions['search_fts'] = fts
+    return fts
+
+def rebuild():
+    with db.engine.begin() as conn:
+        for indice in INDICES.values():
+            fts = f"{indice['tabela']}_fts"
+            conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+@click.command('rebuild-search')
+@with_appcontext
+def rebuild_command():
+    """Reconstrói os índices de busca textual."""
+    rebuild()
+    click.echo('Índices de busca reconstruídos.')
+
+def match_expression(termo):
+    """Converte o texto digitado em uma consulta FTS5 de prefixo ("joa"* "acu"*)."""
+    tokens = re.findall(r'\w+', termo or '')
+    return ' '.join(f'"{t}"*' for t in tokens)
+
+def search(tipo, termo, page=1, per_page=25):
+    """Busca ranqueada e paginada. Retorna (itens, has_next)."""
+    indice = INDICES[tipo]
+    model = indice['model']
+    offset = (page - 1) * per_page
+
+    if not disponivel():
+        filtro = or_(*(getattr(model, c).ilike(f'%{termo}%') for c in indice['colunas']))
+        coluna = getattr(model, indice['colunas'][0])
+        rows = model.query.filter(filtro).order_by(coluna).offset(offset).limit(per_page + 1).all()
+        return rows[:per_page], len(rows) > per_page
+
+    expr = match_expression(termo)
+    if not expr:
+        return [], False
+
+    fts = f"{indice['tabela']}_fts"
+    pesos = ', '.join(str(p) for p in indice['pesos'])
+    ids = db.session.execute(
+        text(f'SELECT rowid FROM {fts} WHERE {fts} MATCH :expr ORDER BY bm25({fts}, {pesos}) LIMIT :limit OFFSET :offset'),
+        {'expr': expr, 'limit': per_page + 1, 'offset': offset}
+    ).scalars().all()
+    has_next = len(ids) > per_page
+    ids = ids[:per_page]
+    if not ids:
+        return [], False
+
+    por_id = {obj.id: obj for obj in model.query.filter(model.id.in_(ids)).all()}
+    return [por_id[i] for i in ids if i in por_id], has_next
@@ -0,0 +1,13 @@
+from . import db
+from .models import TableVersion
+
+# ---------- CONTADORES DE VERSÃO POR TABELA ----------
+# Gatilhos AFTER INSERT/UPDATE/DELETE incrementam table_version.versao, então
+# qualquer caminho de escrita (ORM, bulk, importação, CLI) muda a versão.
+# Contadores e gatilhos são criados pelas migrações (migrations/).
+
+def atuais(*tabelas):
+    """Versões atuais das tabelas pedidas, na mesma ordem, em uma consulta."""
+    linhas = dict(db.session.query(TableVersion.tabela, TableVersion.versao)
+                  .filter(TableVersion.tabela.in_(tabelas)).all())
+    return tuple(linhas.get(t, 0) for t in tabelas)
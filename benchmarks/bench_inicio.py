@@ -0,0 +1,76 @@
+"""Benchmark do tempo de inicialização de um worker.
+
+Cada rodada é um processo Python novo (como um worker do gunicorn recém
+criado) que importa o app, chama create_app e atende a primeira requisição
+com o test client. Mede cada etapa e conta as conexões e comandos SQL feitos
+por create_app, que devem ser zero: o esquema vem das migrações.
+
+Uso: python benchmarks/bench_inicio.py [--rodadas 10] [--url /login]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# Executado em um processo novo a cada rodada
+RODADA = """
+import json, sys, time
+inicio = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+contagem = {'conexoes': 0, 'comandos': 0}
+event.listen(Engine, 'connect', lambda *a: contagem.__setitem__('conexoes', contagem['conexoes'] + 1))
+event.listen(Engine, 'before_cursor_execute', lambda *a: contagem.__setitem__('comandos', contagem['comandos'] + 1))
+from app import create_app
+importado = time.perf_counter()
+app = create_app(test_config={'SQLALCHEMY_DATABASE_URI': sys.argv[1]})
+criado = time.perf_counter()
+boot = dict(contagem)
+resposta = app.test_client().get(sys.argv[2])
+fim = time.perf_counter()
+print(json.dumps({
+    'import': importado - inicio, 'create_app': criado - importado, 'primeira_requisicao': fim - criado,
+    'total': fim - inicio, 'status': resposta.status_code,
+    'conexoes_boot': boot['conexoes'], 'comandos_boot': boot['comandos'],
+}))
+"""
+
+
+def rodada(uri, url):
+    saida = subprocess.run([sys.executable, '-c', RODADA, uri, url], cwd=RAIZ, check=True,
+                           capture_output=True, text=True).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rodadas', type=int, default=10)
+    parser.add_argument('--url', default='/login')
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.database import criar_esquema
+
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = f"sqlite:///{os.path.join(tmp, 'inicio.db')}"
+        criar_esquema(create_app(test_config={'SQLALCHEMY_DATABASE_URI': uri}))
+
+        rodada(uri, args.url)  # aquece o cache de bytecode e do sistema de arquivos
+        resultados = [rodada(uri, args.url) for _ in range(args.rodadas)]
+
+    for etapa in ('import', 'create_app', 'primeira_requisicao', 'total'):
+        tempos = sorted(r[etapa] * 1000 for r in resultados)
+        print(f'{etapa:<20} p50 {statistics.median(tempos):7.1f} ms   máx {tempos[-1]:7.1f} ms')
+    ultimo = resultados[-1]
+    print(f"GET {args.url} -> {ultimo['status']}; create_app abriu {ultimo['conexoes_boot']} conexões "
+          f"e executou {ultimo['comandos_boot']} comandos SQL")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark da previsão de demanda (previsao.py).
+
+Gera um banco descartável com N produtos e o resumo diário por produto
+(sale_daily_product) de vários anos, cada produto vendendo em uma fração
+dos dias, e mede o cálculo das sugestões de reposição sem cache e com
+cache, além do tamanho das leituras em bloco.
+
+Uso: python benchmarks/bench_previsao.py [--produtos 50000] [--anos 3] [--densidade 0.2]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from app import create_app, db, previsao
+from app.cache import previsao_cache
+from app.database import criar_esquema
+from app.models import Product, SaleDailyProduct, Supplier
+
+LOTE = 50000
+
+
+def _em_lotes(model, linhas):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= LOTE:
+            db.session.execute(insert(model), lote)
+            lote = []
+    if lote:
+        db.session.execute(insert(model), lote)
+    db.session.commit()
+
+
+def popular(produtos, anos, densidade, seed=42):
+    rnd = random.Random(seed)
+    hoje = datetime.utcnow().date()
+    dias = 365 * anos
+    fornecedores = max(produtos // 20, 2)
+    _em_lotes(Supplier, ({'nome': f'Fornecedor {i}'} for i in range(1, fornecedores + 1)))
+    _em_lotes(Product, (
+        {'nome': f'Produto {i}', 'preco': 10, 'estoque': rnd.randint(0, 500), 'estoque_minimo': rnd.randint(0, 20),
+         'fornecedor_id': rnd.randint(1, fornecedores)}
+        for i in range(1, produtos + 1)
+    ))
+
+    def resumos():
+        for produto_id in range(1, produtos + 1):
+            for atras in range(1, dias + 1):
+                if rnd.random() < densidade:
+                    quantidade = rnd.randint(1, 10)
+                    yield {'dia': hoje - timedelta(days=atras), 'produto_id': produto_id,
+                           'quantidade': quantidade, 'total': quantidade * 10, 'vendas': 1}
+    _em_lotes(SaleDailyProduct, resumos())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--produtos', type=int, default=50000)
+    parser.add_argument('--anos', type=int, default=3)
+    parser.add_argument('--densidade', type=float, default=0.2, help='fração dos dias com venda de cada produto')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(test_config={'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'previsao.db')}",
+                                      'PREVISAO_HISTORICO_DIAS': 365 * args.anos})
+        criar_esquema(app)
+        with app.app_context():
+            inicio = time.perf_counter()
+            popular(args.produtos, args.anos, args.densidade)
+            linhas = db.session.query(SaleDailyProduct).count()
+            print(f'{args.produtos} produtos, {linhas} resumos diários gerados em {time.perf_counter() - inicio:.1f} s')
+
+            tempos = []
+            for _ in range(args.repeticoes):
+                previsao_cache.clear()
+                inicio = time.perf_counter()
+                sugestoes = previsao.sugestoes()
+                tempos.append(time.perf_counter() - inicio)
+            print(f'sem cache: melhor {min(tempos):.2f} s, pior {max(tempos):.2f} s '
+                  f'({len(sugestoes)} produtos a repor)')
+
+            inicio = time.perf_counter()
+            previsao.sugestoes()
+            print(f'com cache: {(time.perf_counter() - inicio) * 1000:.1f} ms')
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
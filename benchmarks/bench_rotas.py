@@ -0,0 +1,249 @@
+"""Benchmark das rotas do blueprint main.
+
+Gera um banco descartável na escala pedida (ver dados.py), faz login com o
+test client do Flask e executa cada cenário várias vezes, medindo p50/p95
+de latência, número de consultas SQL por requisição e pico de memória
+alocada (tracemalloc, em uma execução separada). O resultado é salvo em
+JSON para comparar execuções.
+
+Uso:
+  python benchmarks/bench_rotas.py --escala 10k
+  python benchmarks/bench_rotas.py --escala 100k --comparar benchmarks/resultados/anterior.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from app import create_app, db, jobs
+from app.models import Sale, User
+
+import dados
+
+ESCALAS = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultados')
+
+# Rotas do blueprint que não entram no benchmark (alteram a sessão ou apagam
+# dados de que os demais cenários dependem)
+IGNORADAS = {
+    'main.logout', 'main.login', 'main.register', 'main.delete_user', 'main.deletar_cliente',
+    'main.deletar_produto', 'main.deletar_fornecedor',
+}
+
+
+def cenarios(n, tarefa_id):
+    """(nome, endpoint, método, url ou função(i) -> url, dados do POST ou função(i)).
+
+    tarefa_id é uma exportação já concluída do usuário do benchmark.
+    """
+    meio = '2024-01-01'
+    return [
+        ('index', 'main.index', 'GET', '/', None),
+        ('dashboard', 'main.dashboard', 'GET', '/dashboard', None),
+        ('dashboard_cache', 'main.dashboard_cache', 'GET', '/dashboard/cache', None),
+        ('clientes', 'main.clientes', 'GET', '/clientes', None),
+        ('clientes_busca', 'main.clientes', 'GET', '/clientes?search_query=silva', None),
+        ('produtos', 'main.produtos', 'GET', '/produtos', None),
+        ('produtos_busca', 'main.produtos', 'GET', '/produtos?search_query=acucar', None),
+        ('fornecedores', 'main.fornecedores', 'GET', '/fornecedores', None),
+        ('fornecedores_busca', 'main.fornecedores', 'GET', '/fornecedores?search_query=dist', None),
+        ('busca_typeahead', 'main.busca', 'GET', '/busca?q=jo', None),
+        ('vendas', 'main.vendas', 'GET', '/vendas', None),
+        ('vendas_pagina_profunda', 'main.vendas', 'GET', None, 'cursor_profundo'),
+        ('vendas_filtro', 'main.vendas', 'GET', f'/vendas?cliente_id=1&start_date={meio}', None),
+        ('relatorios', 'main.relatorios', 'GET', '/relatorios', None),
+        ('relatorios_periodo', 'main.relatorios', 'GET', f'/relatorios?start_date={meio}&end_date=2024-06-30', None),
+        ('exportar_vendas_mensais', 'main.exportar', 'GET', '/exportar/vendas-mensais.csv', None),
+        ('importar_form', 'main.importar', 'GET', '/importar', None),
+        ('exportar_segundo_plano', 'main.exportar_em_segundo_plano', 'POST',
+         f'/tarefas/exportar/vendas.csv?start_date={meio}', {}),
+        ('tarefas', 'main.tarefas', 'GET', '/tarefas', None),
+        ('status_tarefa', 'main.status_tarefa', 'GET', f'/tarefas/{tarefa_id}', None),
+        ('baixar_tarefa', 'main.baixar_tarefa', 'GET', f'/tarefas/{tarefa_id}/download', None),
+        ('estoque_baixo', 'main.estoque_baixo', 'GET', '/produtos/estoque-baixo', None),
+        ('previsao_reposicao', 'main.previsao_reposicao', 'GET', '/produtos/previsao', None),
+        ('configuracoes', 'main.configuracoes', 'GET', '/configuracoes', None),
+        ('users', 'main.users', 'GET', '/users', None),
+        ('novo_cliente_form', 'main.novo_cliente', 'GET', '/clientes/novo', None),
+        ('novo_cliente', 'main.novo_cliente', 'POST', '/clientes/novo', lambda i: {'nome': f'Cliente Bench {i}'}),
+        ('editar_cliente_form', 'main.editar_cliente', 'GET', '/clientes/editar/1', None),
+        ('novo_produto_form', 'main.novo_produto', 'GET', '/produtos/novo', None),
+        ('editar_produto_form', 'main.editar_produto', 'GET', '/produtos/editar/1', None),
+        ('novo_fornecedor_form', 'main.novo_fornecedor', 'GET', '/fornecedores/novo', None),
+        ('editar_fornecedor_form', 'main.editar_fornecedor', 'GET', '/fornecedores/editar/1', None),
+        ('nova_venda_form', 'main.nova_venda', 'GET', '/vendas/nova', None),
+        ('nova_venda', 'main.nova_venda', 'POST', '/vendas/nova',
+         lambda i: {'cliente_id': 1, 'produto_id': str(1 + i % n['produtos']), 'quantidade': '1'}),
+        ('nova_venda_20_itens', 'main.nova_venda', 'POST', '/vendas/nova',
+         lambda i: {'cliente_id': 1, 'produto_id': [str(1 + (i + k) % n['produtos']) for k in range(20)],
+                    'quantidade': ['1'] * 20}),
+        ('deletar_venda', 'main.deletar_venda', 'POST', lambda i: f"/vendas/deletar/{n['vendas'] - i}", {}),
+    ]
+
+
+class ContadorConsultas:
+    def __init__(self, engine):
+        self.total = 0
+        event.listen(engine, 'before_cursor_execute', self._contar)
+
+    def _contar(self, *args):
+        self.total += 1
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p
+    f = int(k)
+    c = min(f + 1, len(ordenados) - 1)
+    return ordenados[f] + (ordenados[c] - ordenados[f]) * (k - f)
+
+
+def executar(escala, repeticoes, db_path=None):
+    vendas = ESCALAS[escala]
+    n = dados.proporcoes(vendas)
+    tmp = None
+    if db_path is None:
+        tmp = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmp.name, 'bench.db')
+    if not os.path.exists(db_path):
+        inicio = time.perf_counter()
+        dados.criar_banco(db_path, vendas)
+        print(f'Banco com {vendas} vendas gerado em {time.perf_counter() - inicio:.1f} s', file=sys.stderr)
+
+    # Arquivos das tarefas fora do instance/ do projeto
+    jobs_dir = tempfile.TemporaryDirectory()
+    app = create_app(test_config={'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}', 'WTF_CSRF_ENABLED': False,
+                                  'JOBS_DIR': jobs_dir.name})
+    client = app.test_client()
+    usuario, _, senha = dados.BENCH_USER
+    resposta = client.post('/login', data={'username': usuario, 'password': senha})
+    assert resposta.status_code == 302, 'falha no login do benchmark'
+
+    with app.app_context():
+        contador = ContadorConsultas(db.engine)
+        # Cursor de uma página perto do fim do histórico
+        antiga = Sale.query.order_by(Sale.created_at.asc(), Sale.id.asc()).offset(100).first()
+        cursor_profundo = f'/vendas?cursor={antiga.created_at.isoformat()}_{antiga.id}'
+        # Tarefa concluída para os cenários de status e download
+        bench = User.query.filter_by(username=usuario).one()
+        tarefa = jobs.enfileirar('exportar', {'recurso': 'clientes', 'formato': 'csv'}, bench.id)
+        tarefa_id = tarefa.id
+        jobs.executar(tarefa_id)
+
+    resultados = {}
+    contador_iter = 0
+    for nome, endpoint, metodo, url, corpo in cenarios(n, tarefa_id):
+        if corpo == 'cursor_profundo':
+            url, corpo = cursor_profundo, None
+        tempos, consultas, status = [], [], set()
+
+        def requisicao():
+            nonlocal contador_iter
+            contador_iter += 1
+            alvo = url(contador_iter) if callable(url) else url
+            dados_post = corpo(contador_iter) if callable(corpo) else corpo
+            if metodo == 'POST':
+                return client.post(alvo, data=dados_post)
+            return client.get(alvo)
+
+        for _ in range(repeticoes):
+            antes = contador.total
+            inicio = time.perf_counter()
+            resposta = requisicao()
+            resposta.get_data()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            consultas.append(contador.total - antes)
+            status.add(resposta.status_code)
+
+        tracemalloc.start()
+        requisicao().get_data()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        resultados[nome] = {
+            'endpoint': endpoint,
+            'metodo': metodo,
+            'p50_ms': round(statistics.median(tempos), 3),
+            'p95_ms': round(_percentil(tempos, 0.95), 3),
+            'consultas': round(statistics.median(consultas), 1),
+            'pico_memoria_kb': round(pico / 1024, 1),
+            'status': sorted(status),
+        }
+
+    cobertos = {r['endpoint'] for r in resultados.values()}
+    faltando = sorted(
+        rule.endpoint for rule in app.url_map.iter_rules()
+        if rule.endpoint.startswith('main.') and rule.endpoint not in cobertos and rule.endpoint not in IGNORADAS
+    )
+    if tmp:
+        with app.app_context():
+            db.engine.dispose()
+        tmp.cleanup()
+    jobs_dir.cleanup()
+    return {
+        'escala': escala,
+        'vendas': vendas,
+        'repeticoes': repeticoes,
+        'data': datetime.utcnow().isoformat(timespec='seconds'),
+        'commit': _commit_atual(),
+        'python': platform.python_version(),
+        'rotas_sem_cenario': faltando,
+        'resultados': resultados,
+    }
+
+
+def _commit_atual():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def imprimir(relatorio, anterior=None):
+    print(f"{'cenário':<26}{'p50 ms':>10}{'p95 ms':>10}{'consultas':>11}{'pico KB':>10}")
+    for nome, r in relatorio['resultados'].items():
+        linha = f"{nome:<26}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['consultas']:>11}{r['pico_memoria_kb']:>10.1f}"
+        antes = (anterior or {}).get('resultados', {}).get(nome)
+        if antes and antes['p50_ms']:
+            linha += f"   p50 {(r['p50_ms'] / antes['p50_ms'] - 1) * 100:+.1f}%"
+        print(linha)
+    if relatorio['rotas_sem_cenario']:
+        print('Rotas sem cenário:', ', '.join(relatorio['rotas_sem_cenario']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--escala', choices=list(ESCALAS), default='10k')
+    parser.add_argument('--repeticoes', type=int, default=20)
+    parser.add_argument('--db', help='reutiliza (ou cria) este arquivo SQLite em vez de um descartável')
+    parser.add_argument('--saida', help='arquivo JSON de saída (padrão: benchmarks/resultados/<data>-<escala>.json)')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior para comparar')
+    args = parser.parse_args()
+
+    relatorio = executar(args.escala, args.repeticoes, os.path.abspath(args.db) if args.db else None)
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            anterior = json.load(f)
+    imprimir(relatorio, anterior)
+
+    saida = args.saida or os.path.join(RESULTADOS, f"{relatorio['data'].replace(':', '')}-{args.escala}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    print(f'Resultado salvo em {saida}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Gerador de dados sintéticos para benchmarks.
+
+Cria clientes, fornecedores, produtos e vendas em proporções realistas
+(por padrão 1 cliente para cada 20 vendas, 1 produto para cada 100 e
+1 fornecedor para cada 20 produtos), com nomes em português e vendas
+distribuídas pelos últimos três anos. Grava em lotes com executemany e
+reconstrói os resumos ao final.
+
+Uso: python benchmarks/dados.py --vendas 100000 --db /tmp/bench.db
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from app import create_app, db, rollups
+from app.database import criar_esquema
+from app.models import Client, Product, Sale, Supplier, User
+
+NOMES = ['João', 'Maria', 'José', 'Ana', 'Antônio', 'Francisca', 'Luís', 'Márcia', 'Conceição', 'Sebastião',
+         'Lúcia', 'André', 'Fábio', 'Gonçalo', 'Helena', 'Inês', 'Júlia', 'Otávio', 'Raquel', 'Vitória']
+SOBRENOMES = ['Silva', 'Souza', 'Araújo', 'Gonçalves', 'Conceição', 'Magalhães', 'Brandão', 'Simões', 'Lima',
+              'Pereira', 'Ribeiro', 'Cardoso', 'Monteiro', 'Assunção', 'Falcão']
+PRODUTOS = ['Açúcar', 'Café', 'Feijão', 'Arroz', 'Óleo', 'Macarrão', 'Farinha', 'Sabão', 'Pão', 'Leite',
+            'Manteiga', 'Maçã', 'Limão', 'Mamão', 'Algodão', 'Caderno', 'Lápis', 'Cartão', 'Pêssego', 'Atum']
+VARIANTES = ['Tradicional', 'Orgânico', 'Integral', 'Premium', 'Econômico', 'Light', 'Extra', 'Família']
+EMPRESAS = ['Distribuidora', 'Atacadão', 'Comércio', 'Indústria', 'Importadora', 'Cooperativa']
+
+BENCH_USER = ('bench', 'bench@example.com', 'bench-senha')
+LOTE = 10000
+
+
+def proporcoes(vendas):
+    produtos = max(vendas // 100, 10)
+    return {
+        'vendas': vendas,
+        'clientes': max(vendas // 20, 10),
+        'produtos': produtos,
+        'fornecedores': max(produtos // 20, 2),
+    }
+
+
+def _em_lotes(model, linhas):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= LOTE:
+            db.session.execute(insert(model), lote)
+            lote = []
+    if lote:
+        db.session.execute(insert(model), lote)
+    db.session.commit()
+
+
+def gerar(vendas, seed=42, anos=3):
+    """Popula o banco do app atual (dentro do app context)."""
+    rnd = random.Random(seed)
+    n = proporcoes(vendas)
+    agora = datetime.utcnow()
+    inicio = agora - timedelta(days=365 * anos)
+    segundos_periodo = int((agora - inicio).total_seconds())
+
+    user = User(username=BENCH_USER[0], email=BENCH_USER[1])
+    user.set_password(BENCH_USER[2])
+    db.session.add(user)
+    db.session.commit()
+
+    _em_lotes(Supplier, (
+        {'nome': f'{rnd.choice(EMPRESAS)} {rnd.choice(SOBRENOMES)} {i}', 'email': f'fornecedor{i}@example.com',
+         'telefone': f'11 9{i:08d}', 'created_at': inicio}
+        for i in range(1, n['fornecedores'] + 1)
+    ))
+    _em_lotes(Client, (
+        {'nome': f'{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {i}', 'email': f'cliente{i}@example.com',
+         'telefone': f'21 9{i:08d}', 'created_at': inicio + timedelta(seconds=rnd.randrange(segundos_periodo))}
+        for i in range(1, n['clientes'] + 1)
+    ))
+    precos = [Decimal(str(round(rnd.uniform(1, 200), 2))) for _ in range(n['produtos'])]
+    _em_lotes(Product, (
+        {'nome': f'{rnd.choice(PRODUTOS)} {rnd.choice(VARIANTES)} {i}', 'preco': precos[i - 1],
+         'estoque': rnd.randint(0, 5000), 'fornecedor_id': rnd.randint(1, n['fornecedores']),
+         'created_at': inicio + timedelta(seconds=rnd.randrange(segundos_periodo))}
+        for i in range(1, n['produtos'] + 1)
+    ))
+
+    def vendas_geradas():
+        for _ in range(n['vendas']):
+            # Poucos produtos concentram a maior parte das vendas
+            produto_id = min(int(rnd.paretovariate(1.2)), n['produtos'])
+            quantidade = rnd.randint(1, 5)
+            yield {
+                'cliente_id': rnd.randint(1, n['clientes']),
+                'produto_id': produto_id,
+                'quantidade': quantidade,
+                'total': precos[produto_id - 1] * quantidade,
+                'created_at': inicio + timedelta(seconds=rnd.randrange(segundos_periodo)),
+            }
+    _em_lotes(Sale, vendas_geradas())
+    rollups.rebuild()
+    return n
+
+
+def criar_banco(caminho, vendas, seed=42):
+    app = create_app(test_config={'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho}'})
+    criar_esquema(app)
+    with app.app_context():
+        n = gerar(vendas, seed=seed)
+        db.engine.dispose()
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vendas', type=int, default=10000)
+    parser.add_argument('--db', required=True, help='arquivo SQLite de destino (não pode existir)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    if os.path.exists(args.db):
+        parser.error(f'{args.db} já existe')
+
+    inicio = time.perf_counter()
+    n = criar_banco(os.path.abspath(args.db), args.vendas, args.seed)
+    print(f"{n['vendas']} vendas, {n['clientes']} clientes, {n['produtos']} produtos, "
+          f"{n['fornecedores']} fornecedores em {time.perf_counter() - inicio:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Benchmark de concorrência leitura/escrita do SQLite.
+
+Compara o engine sem ajustes (journal DELETE, synchronous FULL) com os
+PRAGMAs de Config.SQLITE_PRAGMAS (WAL, synchronous NORMAL, busy_timeout,
+cache e mmap). Processos leitores percorrem o livro de vendas enquanto
+processos escritores registram vendas, durante o mesmo intervalo.
+
+Uso: python benchmarks/sqlite_concorrencia.py [--leitores 4] [--escritores 2] [--segundos 5] [--vendas 20000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from app import create_app, db
+from app.config import Config
+from app.database import criar_esquema
+from app.models import Client, Product, Sale
+from app.pagination import keyset_page
+from app.sales import efetuar_pedido
+
+PERFIS = {
+    'padrao': {'SQLITE_PRAGMAS': {}},
+    'ajustado': {'SQLITE_PRAGMAS': Config.SQLITE_PRAGMAS},
+}
+
+
+def _criar_app(uri, perfil):
+    return create_app(test_config={'SQLALCHEMY_DATABASE_URI': uri, **PERFIS[perfil]})
+
+
+def _leitor(args):
+    uri, perfil, segundos = args
+    app = _criar_app(uri, perfil)
+    feitas = erros = 0
+    with app.app_context():
+        fim = time.perf_counter() + segundos
+        cursor = None
+        while time.perf_counter() < fim:
+            try:
+                _, cursor = keyset_page(Sale.query, Sale.created_at, Sale.id, cursor=cursor, per_page=50)
+                db.session.rollback()
+                feitas += 1
+            except OperationalError:
+                db.session.rollback()
+                erros += 1
+    return 'leitura', feitas, erros
+
+
+def _escritor(args):
+    uri, perfil, segundos = args
+    app = _criar_app(uri, perfil)
+    feitas = erros = 0
+    with app.app_context():
+        fim = time.perf_counter() + segundos
+        while time.perf_counter() < fim:
+            try:
+                efetuar_pedido(1, [(1, 1)])
+                feitas += 1
+            except OperationalError:
+                erros += 1
+    return 'escrita', feitas, erros
+
+
+def _executar(tarefa):
+    funcao, args = tarefa
+    return funcao(args)
+
+
+def rodada(perfil, leitores, escritores, segundos, vendas):
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app = _criar_app(uri, perfil)
+        criar_esquema(app)
+        with app.app_context():
+            db.session.add_all([Client(nome='Cliente'), Product(nome='Produto', preco=1.0, estoque=10 ** 9)])
+            db.session.commit()
+            base = datetime(2024, 1, 1)
+            db.session.execute(insert(Sale), [
+                {'cliente_id': 1, 'produto_id': 1, 'quantidade': 1, 'total': 1.0, 'created_at': base + timedelta(minutes=i)}
+                for i in range(vendas)
+            ])
+            db.session.commit()
+            db.engine.dispose()
+
+        tarefas = [(_leitor, (uri, perfil, segundos))] * leitores + [(_escritor, (uri, perfil, segundos))] * escritores
+        with Pool(len(tarefas)) as pool:
+            resultados = pool.map(_executar, tarefas)
+
+    totais = {'leitura': [0, 0], 'escrita': [0, 0]}
+    for tipo, feitas, erros in resultados:
+        totais[tipo][0] += feitas
+        totais[tipo][1] += erros
+    return {
+        'perfil': perfil,
+        'leituras_por_segundo': round(totais['leitura'][0] / segundos, 1),
+        'escritas_por_segundo': round(totais['escrita'][0] / segundos, 1),
+        'erros_leitura': totais['leitura'][1],
+        'erros_escrita': totais['escrita'][1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--leitores', type=int, default=4)
+    parser.add_argument('--escritores', type=int, default=2)
+    parser.add_argument('--segundos', type=float, default=5)
+    parser.add_argument('--vendas', type=int, default=20000, help='vendas pré-carregadas')
+    args = parser.parse_args()
+
+    for perfil in PERFIS:
+        r = rodada(perfil, args.leitores, args.escritores, args.segundos, args.vendas)
+        print(f"{r['perfil']:>9}: {r['leituras_por_segundo']:>9} leituras/s, {r['escritas_por_segundo']:>8} escritas/s, "
+              f"erros leitura/escrita: {r['erros_leitura']}/{r['erros_escrita']}")
+
+
+if __name__ == '__main__':
+    main()
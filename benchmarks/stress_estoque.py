@@ -0,0 +1,84 @@
+"""Teste de estresse da baixa de estoque em nova_venda (efetuar_pedido).
+
+Vários processos (como workers do gunicorn) registram vendas do mesmo
+produto ao mesmo tempo. Ao final verifica que o estoque nunca ficou
+negativo, que nenhuma baixa foi perdida e mostra a vazão por nº de workers.
+
+Uso: python benchmarks/stress_estoque.py [--vendas 400] [--estoque 1000] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.database import criar_esquema
+from app.models import Client, Product, Sale
+from app.sales import efetuar_pedido, EstoqueInsuficiente
+
+
+def _worker(args):
+    uri, cliente_id, produto_id, vendas = args
+    app = create_app(test_config={'SQLALCHEMY_DATABASE_URI': uri})
+    ok = recusadas = 0
+    with app.app_context():
+        for _ in range(vendas):
+            try:
+                efetuar_pedido(cliente_id, [(produto_id, 1)])
+                ok += 1
+            except EstoqueInsuficiente:
+                recusadas += 1
+    return ok, recusadas
+
+
+def rodada(workers, vendas_por_worker, estoque):
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = f"sqlite:///{os.path.join(tmp, 'stress.db')}"
+        app = create_app(test_config={'SQLALCHEMY_DATABASE_URI': uri})
+        criar_esquema(app)
+        with app.app_context():
+            cliente = Client(nome='Cliente Stress')
+            produto = Product(nome='Produto Stress', preco=1.0, estoque=estoque)
+            db.session.add_all([cliente, produto])
+            db.session.commit()
+            cliente_id, produto_id = cliente.id, produto.id
+            db.engine.dispose()
+
+        inicio = time.perf_counter()
+        with Pool(workers) as pool:
+            resultados = pool.map(_worker, [(uri, cliente_id, produto_id, vendas_por_worker)] * workers)
+        duracao = time.perf_counter() - inicio
+
+        ok = sum(r[0] for r in resultados)
+        recusadas = sum(r[1] for r in resultados)
+        with app.app_context():
+            final = db.session.get(Product, produto_id).estoque
+            registradas = Sale.query.count()
+            db.engine.dispose()
+
+    assert final >= 0, f'estoque negativo: {final}'
+    assert final == estoque - ok, f'baixa perdida: estoque {final}, esperado {estoque - ok}'
+    assert registradas == ok, f'{registradas} vendas gravadas, {ok} confirmadas'
+    return {'workers': workers, 'ok': ok, 'recusadas': recusadas, 'estoque_final': final,
+            'segundos': round(duracao, 3), 'vendas_por_segundo': round((ok + recusadas) / duracao, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vendas', type=int, default=400, help='tentativas de venda por worker')
+    parser.add_argument('--estoque', type=int, default=1000, help='estoque inicial do produto')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    for workers in args.workers:
+        r = rodada(workers, args.vendas, args.estoque)
+        print(f"{r['workers']:>2} workers: {r['ok']:>5} vendas, {r['recusadas']:>5} recusadas, "
+              f"estoque final {r['estoque_final']:>5}, {r['vendas_por_segundo']:>8} tentativas/s")
+
+
+if __name__ == '__main__':
+    main()
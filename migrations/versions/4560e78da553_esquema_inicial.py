@@ -0,0 +1,325 @@
+"""esquema inicial
+
+Cria o esquema completo em um banco vazio. Em bancos criados antes das
+migrações (pelo antigo db.create_all no boot), cria só o que falta: tabelas
+novas, índices e, quando faltam colunas ou o dinheiro ainda está em REAL,
+recria a tabela copiando os dados (valores monetários convertidos para
+centavos). Por fim cria os objetos do SQLite que não vêm dos modelos:
+contadores de table_version, gatilhos e índices de busca FTS5, com o DDL
+copiado aqui (não importa nada do app).
+
+Faça backup de bancos existentes antes de rodar `flask db upgrade`.
+
+Revision ID: 4560e78da553
+Revises:
+Create Date: 2026-10-18 20:35:04.487750
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4560e78da553'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# Colunas em centavos (INTEGER); em bancos antigos eram REAL
+DINHEIRO = {
+    'product': ('preco',),
+    'sale': ('total',),
+    'sale_order': ('total',),
+    'sale_daily': ('total',),
+    'sale_daily_product': ('total',),
+    'sale_daily_client': ('total',),
+}
+
+# ---------- OBJETOS DO SQLITE FORA DOS MODELOS ----------
+# Cópia congelada do DDL desta revisão: mudanças em gatilhos, contadores ou
+# índices FTS vão em revisões novas, nunca aqui nem importando do app.
+
+# Contadores de table_version (app/versions.py), com gatilhos de INSERT/UPDATE/DELETE
+VERSIONADAS = (
+    'client', 'product', 'supplier', 'sale', 'sale_order', 'user',
+    'sale_daily', 'sale_daily_product', 'sale_daily_client',
+    'stock_movement', 'stock_checkpoint',
+)
+
+# Invalidação dos meses guardados pelos relatórios (app/reports.py)
+_VERSAO_MES = (
+    "INSERT INTO table_version (tabela, versao) VALUES ('relatorio:' || strftime('%Y-%m', {linha}.created_at), 1) "
+    "ON CONFLICT(tabela) DO UPDATE SET versao = versao + 1;"
+)
+GATILHOS_RELATORIO = (
+    'CREATE TRIGGER IF NOT EXISTS sale_relatorio_ad AFTER DELETE ON sale BEGIN '
+    f"{_VERSAO_MES.format(linha='OLD')} END",
+    'CREATE TRIGGER IF NOT EXISTS sale_relatorio_au AFTER UPDATE OF created_at, quantidade, total, '
+    f"produto_id, cliente_id ON sale BEGIN {_VERSAO_MES.format(linha='OLD')} {_VERSAO_MES.format(linha='NEW')} END",
+)
+
+# Busca textual (app/search.py): tabela -> colunas indexadas
+BUSCA = {
+    'client': ('nome', 'email'),
+    'product': ('nome', 'descricao'),
+    'supplier': ('nome', 'email'),
+}
+TOKENIZER = 'unicode61 remove_diacritics 2'
+
+FTS = tuple(f'{tabela}_fts' for tabela in BUSCA)
+
+
+def _esquema():
+    meta = sa.MetaData()
+    sa.Table('client', meta,
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nome', sa.String(length=120), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=True),
+        sa.Column('telefone', sa.String(length=50), nullable=True),
+        sa.Column('notas', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    sa.Table('sale_daily', meta,
+        sa.Column('dia', sa.Date(), nullable=False),
+        sa.Column('quantidade', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('vendas', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('dia'),
+    )
+    sa.Table('supplier', meta,
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nome', sa.String(length=120), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=True),
+        sa.Column('telefone', sa.String(length=50), nullable=True),
+        sa.Column('endereco', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    sa.Table('table_version', meta,
+        sa.Column('tabela', sa.String(length=64), nullable=False),
+        sa.Column('versao', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('tabela'),
+    )
+    sa.Table('user', meta,
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=150), nullable=False),
+        sa.Column('email', sa.String(length=150), nullable=False),
+        sa.Column('password_hash', sa.String(length=256), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email'),
+        sa.UniqueConstraint('username'),
+    )
+    sa.Table('job', meta,
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.String(length=32), nullable=False),
+        sa.Column('parametros', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('processados', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=True),
+        sa.Column('resultado', sa.Text(), nullable=True),
+        sa.Column('erro', sa.Text(), nullable=True),
+        sa.Column('arquivo', sa.String(length=255), nullable=True),
+        sa.Column('nome_arquivo', sa.String(length=255), nullable=True),
+        sa.Column('mimetype', sa.String(length=128), nullable=True),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('worker', sa.String(length=64), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('iniciado_em', sa.DateTime(), nullable=True),
+        sa.Column('concluido_em', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['usuario_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.Index('ix_job_status_id', 'status', 'id'),
+        sa.Index('ix_job_usuario_id', 'usuario_id'),
+    )
+    sa.Table('product', meta,
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nome', sa.String(length=120), nullable=False),
+        sa.Column('preco', sa.Integer(), nullable=False),
+        sa.Column('descricao', sa.Text(), nullable=True),
+        sa.Column('estoque', sa.Integer(), nullable=True),
+        sa.Column('estoque_minimo', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('fornecedor_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['fornecedor_id'], ['supplier.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.Index('ix_product_estoque_baixo', 'fornecedor_id', 'estoque',
+                 sqlite_where=sa.text('estoque <= estoque_minimo')),
+    )
+    sa.Table('sale_daily_client', meta,
+        sa.Column('dia', sa.Date(), nullable=False),
+        sa.Column('cliente_id', sa.Integer(), nullable=False),
+        sa.Column('quantidade', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('vendas', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['cliente_id'], ['client.id'], ),
+        sa.PrimaryKeyConstraint('dia', 'cliente_id'),
+    )
+    sa.Table('sale_order', meta,
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cliente_id', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['cliente_id'], ['client.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    sa.Table('sale', meta,
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cliente_id', sa.Integer(), nullable=False),
+        sa.Column('produto_id', sa.Integer(), nullable=False),
+        sa.Column('quantidade', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('pedido_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['cliente_id'], ['client.id'], ),
+        sa.ForeignKeyConstraint(['pedido_id'], ['sale_order.id'], ),
+        sa.ForeignKeyConstraint(['produto_id'], ['product.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.Index('ix_sale_cliente_created_at_id', 'cliente_id', 'created_at', 'id'),
+        sa.Index('ix_sale_created_at_id', 'created_at', 'id'),
+        sa.Index('ix_sale_pedido_id', 'pedido_id'),
+        sa.Index('ix_sale_produto_created_at_id', 'produto_id', 'created_at', 'id'),
+    )
+    sa.Table('sale_daily_product', meta,
+        sa.Column('dia', sa.Date(), nullable=False),
+        sa.Column('produto_id', sa.Integer(), nullable=False),
+        sa.Column('quantidade', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('vendas', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['produto_id'], ['product.id'], ),
+        sa.PrimaryKeyConstraint('dia', 'produto_id'),
+    )
+    sa.Table('stock_checkpoint', meta,
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('produto_id', sa.Integer(), nullable=False),
+        sa.Column('movimento_id', sa.Integer(), nullable=False),
+        sa.Column('saldo', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['produto_id'], ['product.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.Index('ix_stock_checkpoint_produto_movimento', 'produto_id', 'movimento_id'),
+    )
+    sa.Table('stock_movement', meta,
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('produto_id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.String(length=16), nullable=False),
+        sa.Column('quantidade', sa.Integer(), nullable=False),
+        sa.Column('venda_id', sa.Integer(), nullable=True),
+        sa.Column('usuario_id', sa.Integer(), nullable=True),
+        sa.Column('observacao', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['produto_id'], ['product.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.Index('ix_stock_movement_produto_id', 'produto_id', 'id'),
+    )
+    return meta
+
+
+def _colunas(conn, tabela):
+    return {row[1]: (row[2] or '').upper() for row in conn.exec_driver_sql(f'PRAGMA table_info("{tabela}")')}
+
+
+def _recriar(conn, tabela, existentes):
+    """Recria a tabela pelo esquema atual e copia os dados (dinheiro REAL -> centavos)."""
+    antiga = f'_{tabela.name}_antiga'
+    for indice in conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (tabela.name,)
+    ).scalars().all():
+        conn.exec_driver_sql(f'DROP INDEX "{indice}"')
+    conn.exec_driver_sql(f'ALTER TABLE "{tabela.name}" RENAME TO "{antiga}"')
+    tabela.create(conn)
+
+    nomes, origem = [], []
+    for coluna in tabela.columns:
+        if coluna.name not in existentes:
+            continue  # coluna nova: fica com o padrão do esquema
+        nomes.append(f'"{coluna.name}"')
+        if coluna.name in DINHEIRO.get(tabela.name, ()) and existentes[coluna.name] != 'INTEGER':
+            origem.append(f'CAST(ROUND("{coluna.name}" * 100) AS INTEGER)')
+        else:
+            origem.append(f'"{coluna.name}"')
+    conn.exec_driver_sql(
+        f'INSERT INTO "{tabela.name}" ({", ".join(nomes)}) SELECT {", ".join(origem)} FROM "{antiga}"')
+    conn.exec_driver_sql(f'DROP TABLE "{antiga}"')
+
+
+def _gatilhos_versao(tabela):
+    incrementa = f"UPDATE table_version SET versao = versao + 1 WHERE tabela = '{tabela}';"
+    return [
+        f'CREATE TRIGGER IF NOT EXISTS {tabela}_versao_{sufixo} AFTER {evento} ON "{tabela}" BEGIN {incrementa} END'
+        for sufixo, evento in (('ai', 'INSERT'), ('au', 'UPDATE'), ('ad', 'DELETE'))
+    ]
+
+
+def _ddl_busca(tabela, colunas):
+    fts = f'{tabela}_fts'
+    cols = ', '.join(colunas)
+    new_vals = ', '.join(f'new.{c}' for c in colunas)
+    old_vals = ', '.join(f'old.{c}' for c in colunas)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{tabela}', content_rowid='id', tokenize='{TOKENIZER}')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabela} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_vals}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabela} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {tabela} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_vals}); END",
+    ]
+
+
+def _criar_objetos(conn):
+    """Contadores de versão, gatilhos e índices FTS5 que faltarem (reindexa os FTS recém-criados)."""
+    for tabela in VERSIONADAS:
+        conn.exec_driver_sql('INSERT OR IGNORE INTO table_version (tabela, versao) VALUES (?, 0)', (tabela,))
+        for stmt in _gatilhos_versao(tabela):
+            conn.exec_driver_sql(stmt)
+    for stmt in GATILHOS_RELATORIO:
+        conn.exec_driver_sql(stmt)
+    for tabela, colunas in BUSCA.items():
+        fts = f'{tabela}_fts'
+        existia = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,)).first() is not None
+        try:
+            for stmt in _ddl_busca(tabela, colunas):
+                conn.exec_driver_sql(stmt)
+        except sa.exc.OperationalError:
+            # SQLite sem FTS5: a busca do app usa ILIKE
+            return
+        if not existia:
+            conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspetor = sa.inspect(conn)
+    tabelas = set(inspetor.get_table_names())
+    # Sem reescrever as FKs de outras tabelas para o nome temporário
+    conn.exec_driver_sql('PRAGMA legacy_alter_table = ON')
+    try:
+        for tabela in _esquema().sorted_tables:
+            if tabela.name not in tabelas:
+                tabela.create(conn)
+                continue
+            existentes = _colunas(conn, tabela.name)
+            desatualizada = any(c.name not in existentes for c in tabela.columns) or any(
+                existentes[c] != 'INTEGER' for c in DINHEIRO.get(tabela.name, ()))
+            if desatualizada:
+                _recriar(conn, tabela, existentes)
+                continue
+            indices = {i['name'] for i in inspetor.get_indexes(tabela.name)}
+            for indice in tabela.indexes:
+                if indice.name not in indices:
+                    indice.create(conn)
+    finally:
+        conn.exec_driver_sql('PRAGMA legacy_alter_table = OFF')
+
+    _criar_objetos(conn)
+
+
+def downgrade():
+    for fts in FTS:
+        op.execute(f'DROP TABLE IF EXISTS {fts}')
+    for tabela in reversed(_esquema().sorted_tables):
+        op.drop_table(tabela.name)